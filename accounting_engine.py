@@ -0,0 +1,390 @@
+import logging
+from contextlib import nullcontext
+
+import pandas as pd
+
+from money import round_divide, to_halalas
+from performance import timed_stage
+from schema_detection import apply_schema
+from statement_parsers import parse_statement
+
+logger = logging.getLogger(__name__)
+
+
+class QuietUI:
+    """بديل صامت لواجهة streamlit عند استخدام المحرك خارج التطبيق (API، الأدوات، القياس)
+
+    الرسائل تُتجاهل عدا الأخطاء فتُسجل عبر logging.
+    """
+
+    def spinner(self, text):
+        return nullcontext()
+
+    def error(self, message):
+        logger.error(message)
+
+    def warning(self, message):
+        logger.warning(message)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class ProfessionalAccountingSystem:
+    def __init__(self, uploaded_file, performance=None, ui=None, learn_profiles=True):
+        self.uploaded_file = uploaded_file
+        # حفظ التنسيقات الجديدة كملفات تعريف (يُعطل في الخادم المشترك بين المستأجرين)
+        self.learn_profiles = learn_profiles
+        # واجهة عرض الرسائل (streamlit في التطبيق، وبديل صامت خارجه)
+        self.ui = ui if ui is not None else QuietUI()
+        self.df = None
+        self.journal_entries = []
+        self.accounts = {}
+        self.schema = None
+        self.performance = performance
+        self.load_data()
+        
+    def load_data(self):
+        """تحميل البيانات من الملف المرفوع"""
+        try:
+            if isinstance(self.uploaded_file, pd.DataFrame):
+                self.df = apply_schema(self.uploaded_file.copy())
+            elif self.performance is not None:
+                with self.performance.stage('read_statement'):
+                    self.df, self.schema = parse_statement(self.uploaded_file, learn=self.learn_profiles)
+            else:
+                self.df, self.schema = parse_statement(self.uploaded_file, learn=self.learn_profiles)
+            self.ui.success("✅ تم تحميل البيانات بنجاح")
+            self.ui.info(f"📊 عدد الحركات: {len(self.df)}")
+            if self.schema is not None:
+                if self.schema['bank']:
+                    self.ui.info(f"🏦 تنسيق الكشف: {self.schema['bank']}")
+                elif self.schema.get('learned'):
+                    self.ui.info("🔎 تم التعرف على أعمدة الكشف تلقائياً وحفظ التنسيق للمرات القادمة")
+                elif self.schema.get('scores'):
+                    self.ui.info("🔎 تم التعرف على أعمدة الكشف تلقائياً")
+                else:
+                    self.ui.info("🔁 تم استخدام تنسيق محفوظ من تحميل سابق")
+            self.clean_data()
+        except Exception as e:
+            self.ui.error(f"❌ خطأ في تحميل الملف: {e}")
+    
+    @timed_stage
+    def clean_data(self):
+        """تنظيف البيانات ومعالجتها"""
+        try:
+            # الأعمدة أعيدت تسميتها بالأسماء الموحدة عند التحميل (schema_detection)
+            # تحويل التواريخ
+            self.df['[SA]Processing Date'] = pd.to_datetime(self.df['[SA]Processing Date'], errors='coerce')
+            
+            # تنظيف الأعمدة النقدية وتحويلها إلى أعداد صحيحة بالهللة (money)
+            numeric_columns = ['مدين', 'دائن', 'الرصيد']
+            for col in numeric_columns:
+                if not pd.api.types.is_numeric_dtype(self.df[col]):
+                    # المبالغ المقروءة كنص (CSV) قد تحتوي على فواصل الآلاف
+                    self.df[col] = self.df[col].astype(str).str.replace(',', '', regex=False)
+                self.df[col] = to_halalas(self.df[col])
+            
+            # إضافة أعمدة مساعدة
+            self.df['الشهر'] = self.df['[SA]Processing Date'].dt.month
+            self.df['السنة'] = self.df['[SA]Processing Date'].dt.year
+            
+            self.ui.success("✅ تم تنظيف البيانات بنجاح")
+            self.ui.info(f"🔍 تم التعرف على {len(self.df)} حركة مالية")
+            
+        except Exception as e:
+            self.ui.error(f"❌ خطأ في تنظيف البيانات: {e}")
+            self.ui.info("📋 أسماء الأعمدة الموجودة:")
+            self.ui.write(self.df.columns.tolist())
+    
+    @timed_stage
+    def classify_transactions(self):
+        """تصنيف الحركات إلى حسابات محاسبية"""
+        account_mapping = {
+            'تحويل داخلي صادر': 'مصاريف تشغيل',
+            'حوالة فورية محلية صادرة': 'مصاريف مشتريات',
+            'ضريبة القيمة المضافة': 'مصاريف ضرائب',
+            'رسوم تحويل': 'مصاريف بنكية',
+            'مدفوعات سداد': 'مصاريف سداد قروض',
+            'شراء محلي عبر الإنترنت': 'مصاريف مشتريات',
+            'حوالة محلية واردة': 'إيرادات عمليات',
+            'حوالة فورية محلية واردة': 'إيرادات عمليات',
+            'استرداد عملية سداد': 'إيرادات متنوعة',
+            'سحب نقدي بالريال - صراف الأهلي': 'سحوبات نقدية',
+            'تحويل داخلي وارد': 'إيرادات تحويلات',
+            'حوالة محلية واردة': 'إيرادات عمليات',
+            'حوالة فورية محلية واردة': 'إيرادات عمليات'
+        }
+        
+        self.df['الحساب المحاسبي'] = self.df['التفاصيل'].map(account_mapping)
+        self.df['الحساب المحاسبي'] = self.df['الحساب المحاسبي'].fillna('حسابات متنوعة')
+        
+        # عرض توزيع الحسابات
+        self.ui.info("📊 توزيع الحركات على الحسابات:")
+        account_distribution = self.df['الحساب المحاسبي'].value_counts()
+        self.ui.write(account_distribution)
+    
+    def iter_journal_entries(self):
+        """توليد قيود اليومية قيداً تلو الآخر دون تخزينها"""
+        if 'الحساب المحاسبي' in self.df.columns:
+            accounts = self.df['الحساب المحاسبي']
+        else:
+            accounts = ['حسابات متنوعة'] * len(self.df)
+        
+        for date, description, debit, credit, account in zip(
+            self.df['[SA]Processing Date'], self.df['التفاصيل'],
+            self.df['مدين'], self.df['دائن'], accounts
+        ):
+            if debit > 0:
+                yield {
+                    'التاريخ': date,
+                    'الحساب المدين': account,
+                    'المبلغ المدين': debit,
+                    'الحساب الدائن': 'البنك',
+                    'المبلغ الدائن': debit,
+                    'الوصف': description
+                }
+                
+            if credit > 0:
+                yield {
+                    'التاريخ': date,
+                    'الحساب المدين': 'البنك',
+                    'المبلغ المدين': credit,
+                    'الحساب الدائن': account,
+                    'المبلغ الدائن': credit,
+                    'الوصف': description
+                }
+    
+    @timed_stage
+    def create_journal_entries(self):
+        """إنشاء قيود اليومية"""
+        with self.ui.spinner('📖 جاري إنشاء قيود اليومية...'):
+            self.journal_entries.extend(self.iter_journal_entries())
+        
+        journal_df = pd.DataFrame(self.journal_entries)
+        return journal_df
+    
+    @timed_stage
+    def generate_trial_balance(self):
+        """إنشاء ميزان المراجعة"""
+        with self.ui.spinner('⚖️ جاري إنشاء ميزان المراجعة...'):
+            # نفس قيود iter_journal_entries (قيد مزدوج مع البنك) مجمعة لكل حساب بمجاميع صحيحة بالهللة
+            accounts = self.df['الحساب المحاسبي'] if 'الحساب المحاسبي' in self.df.columns else pd.Series(
+                'حسابات متنوعة', index=self.df.index)
+            debits = self.df['مدين'].where(self.df['مدين'] > 0, 0)
+            credits = self.df['دائن'].where(self.df['دائن'] > 0, 0)
+            
+            # كل مدين على حساب يقابله دائن على البنك، وكل دائن على حساب يقابله مدين على البنك
+            totals = pd.DataFrame({'مدين': debits, 'دائن': credits}).groupby(accounts.to_numpy(), sort=False).sum()
+            totals = totals[(totals['مدين'] > 0) | (totals['دائن'] > 0)]
+            bank = pd.DataFrame({'مدين': [int(credits.sum())], 'دائن': [int(debits.sum())]}, index=['البنك'])
+            if not totals.empty:
+                totals = pd.concat([bank, totals]).groupby(level=0, sort=False).sum()
+            
+            trial_balance_df = pd.DataFrame({
+                'الحساب': totals.index,
+                'مجموع المدين': totals['مدين'].to_numpy(dtype='int64'),
+                'مجموع الدائن': totals['دائن'].to_numpy(dtype='int64'),
+                'الرصيد': (totals['مدين'] - totals['دائن']).to_numpy(dtype='int64'),
+            })
+            return trial_balance_df
+    
+    @timed_stage
+    def generate_income_statement(self):
+        """إنشاء قائمة الدخل"""
+        with self.ui.spinner('📈 جاري إنشاء قائمة الدخل...'):
+            # مجموع صحيح (بالهللة) لكل حساب في مرور واحد
+            totals = self.df.groupby('الحساب المحاسبي')[['مدين', 'دائن']].sum()
+            
+            def total(account, column):
+                return int(totals[column].get(account, 0))
+            
+            revenue_accounts = ['إيرادات عمليات', 'إيرادات تحويلات', 'إيرادات متنوعة']
+            total_revenue = sum(total(account, 'دائن') for account in revenue_accounts)
+            
+            expense_accounts = ['مصاريف تشغيل', 'مصاريف مشتريات', 'مصاريف ضرائب', 'مصاريف بنكية', 'مصاريف سداد قروض']
+            total_expenses = sum(total(account, 'مدين') for account in expense_accounts)
+            
+            net_income = total_revenue - total_expenses
+            
+            income_statement = {
+                'الإيرادات': {
+                    'إيرادات العمليات': total('إيرادات عمليات', 'دائن'),
+                    'إيرادات التحويلات': total('إيرادات تحويلات', 'دائن'),
+                    'إيرادات متنوعة': total('إيرادات متنوعة', 'دائن'),
+                    'إجمالي الإيرادات': total_revenue
+                },
+                'المصروفات': {
+                    'مصاريف تشغيل': total('مصاريف تشغيل', 'مدين'),
+                    'مصاريف مشتريات': total('مصاريف مشتريات', 'مدين'),
+                    'مصاريف ضرائب': total('مصاريف ضرائب', 'مدين'),
+                    'مصاريف بنكية': total('مصاريف بنكية', 'مدين'),
+                    'مصاريف سداد قروض': total('مصاريف سداد قروض', 'مدين'),
+                    'إجمالي المصروفات': total_expenses
+                },
+                'صافي الدخل': net_income
+            }
+            
+            return income_statement
+    
+    @timed_stage
+    def generate_cash_flow_statement(self):
+        """إنشاء قائمة التدفقات النقدية"""
+        with self.ui.spinner('💸 جاري إنشاء قائمة التدفقات النقدية...'):
+            operating_activities = self.df[self.df['الحساب المحاسبي'].isin([
+                'إيرادات عمليات', 'مصاريف تشغيل', 'مصاريف مشتريات'
+            ])]
+            
+            cash_from_operations = int(
+                operating_activities['دائن'].sum() - 
+                operating_activities['مدين'].sum()
+            )
+            
+            financing_activities = self.df[self.df['الحساب المحاسبي'].isin([
+                'مصاريف سداد قروض', 'إيرادات تحويلات'
+            ])]
+            
+            cash_from_financing = int(
+                financing_activities['دائن'].sum() - 
+                financing_activities['مدين'].sum()
+            )
+            
+            net_cash_change = int(self.df['دائن'].sum() - self.df['مدين'].sum())
+            closing_balance = int(self.df['الرصيد'].iloc[-1])
+            opening_balance = closing_balance - net_cash_change
+            
+            cash_flow_statement = {
+                'التدفقات النقدية من الأنشطة التشغيلية': cash_from_operations,
+                'التدفقات النقدية من الأنشطة التمويلية': cash_from_financing,
+                'صافي الزيادة (النقص) في النقد': net_cash_change,
+                'الرصيد النقدي في بداية الفترة': opening_balance,
+                'الرصيد النقدي في نهاية الفترة': closing_balance
+            }
+            
+            return cash_flow_statement
+    
+    @timed_stage
+    def generate_balance_sheet(self):
+        """إنشاء الميزانية العمومية"""
+        with self.ui.spinner('🏦 جاري إنشاء الميزانية العمومية...'):
+            cash_balance = int(self.df['الرصيد'].iloc[-1])
+            income_statement = self.generate_income_statement()
+            net_income = income_statement['صافي الدخل']
+            
+            balance_sheet = {
+                'الأصول': {
+                    'النقد والبنك': cash_balance,
+                    'إجمالي الأصول': cash_balance
+                },
+                'الخصوم': {
+                    'إجمالي الخصوم': 0
+                },
+                'حقوق الملكية': {
+                    'صافي الدخل': net_income,
+                    'إجمالي حقوق الملكية': net_income
+                }
+            }
+            
+            balance_sheet['الخصوم']['إجمالي الخصوم'] = cash_balance - net_income
+            
+            return balance_sheet
+    
+    @timed_stage
+    def generate_expense_analysis(self):
+        """تحليل المصروفات التفصيلي"""
+        with self.ui.spinner('📊 جاري إنشاء تحليل المصروفات...'):
+            expense_data = self.df[self.df['مدين'] > 0].copy()
+            
+            if not expense_data.empty:
+                expense_analysis = expense_data.groupby('الحساب المحاسبي').agg({
+                    'مدين': ['sum', 'count', 'max']
+                })
+                
+                expense_analysis.columns = ['إجمالي المصروفات', 'عدد الحركات', 'أعلى مبلغ']
+                # المتوسط بقسمة صحيحة مقربة لأقرب هللة
+                expense_analysis.insert(2, 'متوسط المبلغ', round_divide(
+                    expense_analysis['إجمالي المصروفات'], expense_analysis['عدد الحركات']))
+            else:
+                expense_analysis = pd.DataFrame()
+            
+            return expense_analysis
+    
+    @timed_stage
+    def generate_revenue_analysis(self):
+        """تحليل الإيرادات التفصيلي"""
+        with self.ui.spinner('📈 جاري إنشاء تحليل الإيرادات...'):
+            revenue_data = self.df[self.df['دائن'] > 0].copy()
+            
+            if not revenue_data.empty:
+                revenue_analysis = revenue_data.groupby('الحساب المحاسبي').agg({
+                    'دائن': ['sum', 'count', 'max']
+                })
+                
+                revenue_analysis.columns = ['إجمالي الإيرادات', 'عدد الحركات', 'أعلى مبلغ']
+                # المتوسط بقسمة صحيحة مقربة لأقرب هللة
+                revenue_analysis.insert(2, 'متوسط المبلغ', round_divide(
+                    revenue_analysis['إجمالي الإيرادات'], revenue_analysis['عدد الحركات']))
+            else:
+                revenue_analysis = pd.DataFrame()
+            
+            return revenue_analysis
+    
+    @timed_stage
+    def link_fees_and_vat(self):
+        """ربط رسوم التحويل وضريبة القيمة المضافة بالحوالة الأصلية"""
+        from fee_linkage import PARENT_COLUMN, link_fees
+        
+        with self.ui.spinner('🔗 جاري ربط الرسوم والضريبة بالحوالات...'):
+            self.df[PARENT_COLUMN] = link_fees(self.df)
+        return self.df[PARENT_COLUMN]
+    
+    @timed_stage
+    def generate_transfer_costs(self):
+        """التكلفة الفعلية لكل حوالة شاملة الرسوم والضريبة"""
+        from fee_linkage import PARENT_COLUMN, transfer_costs
+        
+        if PARENT_COLUMN not in self.df.columns:
+            self.link_fees_and_vat()
+        with self.ui.spinner('💳 جاري حساب التكلفة الفعلية للحوالات...'):
+            return transfer_costs(self.df)
+    
+    @timed_stage
+    def generate_vat_report(self):
+        """ملخص ضريبة القيمة المضافة الشهري"""
+        from fee_linkage import PARENT_COLUMN, vat_summary
+        
+        if PARENT_COLUMN not in self.df.columns:
+            self.link_fees_and_vat()
+        with self.ui.spinner('🧾 جاري إنشاء ملخص ضريبة القيمة المضافة...'):
+            return vat_summary(self.df)
+    
+    @timed_stage
+    def generate_cash_flow_forecast(self, months=3, method='auto'):
+        """توقع صافي التدفق والرصيد للأشهر القادمة لكل حساب محاسبي"""
+        from forecasting import fit_forecast_model, forecast
+        
+        with self.ui.spinner('🔮 جاري توقع التدفقات النقدية...'):
+            model = fit_forecast_model(self.df, method)
+            return forecast(model, months), model['history']
+    
+    @timed_stage
+    def generate_monthly_reports(self):
+        """إنشاء تقارير شهرية"""
+        with self.ui.spinner('📅 جاري إنشاء التقارير الشهرية...'):
+            monthly_data = self.df.groupby(['السنة', 'الشهر']).agg({
+                'مدين': 'sum',
+                'دائن': 'sum',
+                'الرصيد': 'last'
+            }).reset_index()
+            
+            monthly_data['صافي التدفق'] = monthly_data['دائن'] - monthly_data['مدين']
+            
+            # إضافة أسماء الأشهر
+            month_names = {
+                1: 'يناير', 2: 'فبراير', 3: 'مارس', 4: 'أبريل', 
+                5: 'مايو', 6: 'يونيو', 7: 'يوليو', 8: 'أغسطس',
+                9: 'سبتمبر', 10: 'أكتوبر', 11: 'نوفمبر', 12: 'ديسمبر'
+            }
+            monthly_data['اسم الشهر'] = monthly_data['الشهر'].map(month_names)
+            
+            return monthly_data
@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from decimal import Decimal
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from money import decimal_frame, decimal_statement
+
+# عدد الكشوف المعالجة التي تُحفظ في الذاكرة (مشتركة بين جميع المستأجرين)
+CACHE_SIZE = int(os.environ.get('SMART_ACCOUNTING_API_CACHE_SIZE', 64))
+
+# عدد العمال الذين يعالجون الكشوف بالتوازي
+WORKERS = int(os.environ.get('SMART_ACCOUNTING_API_WORKERS', os.cpu_count() or 2))
+
+# أقصى عدد من المهام (قيد الانتظار أو التنفيذ) على مستوى الخادم ولكل مستأجر
+MAX_PENDING_JOBS = int(os.environ.get('SMART_ACCOUNTING_API_MAX_PENDING', 32))
+MAX_TENANT_JOBS = int(os.environ.get('SMART_ACCOUNTING_API_MAX_TENANT_PENDING', 4))
+
+# أقصى حجم للملف المرفوع بالبايت
+MAX_UPLOAD_BYTES = int(os.environ.get('SMART_ACCOUNTING_API_MAX_UPLOAD', 50 * 1024 * 1024))
+
+# عدد المهام المنتهية التي يُحتفظ بحالتها
+JOB_HISTORY = 1024
+
+# الثواني المقترحة للعميل قبل إعادة المحاولة عند امتلاء الطابور
+RETRY_AFTER_SECONDS = 5
+
+TENANT_HEADER = 'X-Tenant-ID'
+DEFAULT_TENANT = 'default'
+
+REPORT_NAMES = [
+    'summary',
+    'trial_balance',
+    'income_statement',
+    'cash_flow',
+    'balance_sheet',
+    'expense_analysis',
+    'revenue_analysis',
+    'monthly_report',
+    'transfer_costs',
+    'vat_summary',
+]
+
+
+def _json_ready(value):
+    """تحويل نتائج النظام المحاسبي (جداول وقيم numpy وDecimal) إلى قيم JSON"""
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        return [_json_ready(row) for row in value.to_dict(orient='records')]
+    if isinstance(value, Decimal):
+        # أقصر تمثيل عشري للقيمة يطابق كتابتها بخانتين عشريتين
+        return float(value)
+    if isinstance(value, dict):
+        return {str(key): _json_ready(item) for key, item in value.items()}
+    if value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def process_statement(content, file_name):
+    """معالجة كشف كامل وإرجاع جميع التقارير كقيم JSON
+
+    دالة على مستوى الوحدة حتى يمكن تنفيذها في مجموعة خيوط أو مجموعة عمليات.
+    """
+    from accounting_engine import ProfessionalAccountingSystem
+
+    source = io.BytesIO(content)
+    source.name = file_name
+    # التنسيق المستنتج لمستأجر لا يُحفظ حتى لا يُفرض على المستأجرين الآخرين
+    accounting_system = ProfessionalAccountingSystem(source, learn_profiles=False)
+    if accounting_system.df is None or 'السنة' not in accounting_system.df.columns:
+        raise ValueError("تعذر قراءة كشف الحساب أو التعرف على أعمدته")
+    accounting_system.classify_transactions()
+
+    df = accounting_system.df
+    schema = accounting_system.schema or {}
+    reports = {
+        'summary': {
+            'file_name': file_name,
+            'rows': len(df),
+            'bank': schema.get('bank'),
+            'profile': schema.get('profile'),
+            'period_start': df['[SA]Processing Date'].min(),
+            'period_end': df['[SA]Processing Date'].max(),
+        },
+        # المبالغ بالهللة وتُحول إلى ريال عند إخراجها فقط
+        'trial_balance': decimal_frame(accounting_system.generate_trial_balance()),
+        'income_statement': decimal_statement(accounting_system.generate_income_statement()),
+        'cash_flow': decimal_statement(accounting_system.generate_cash_flow_statement()),
+        'balance_sheet': decimal_statement(accounting_system.generate_balance_sheet()),
+        'expense_analysis': decimal_frame(accounting_system.generate_expense_analysis().reset_index()),
+        'revenue_analysis': decimal_frame(accounting_system.generate_revenue_analysis().reset_index()),
+        'monthly_report': decimal_frame(accounting_system.generate_monthly_reports()),
+        'transfer_costs': decimal_frame(accounting_system.generate_transfer_costs()),
+        'vat_summary': decimal_frame(accounting_system.generate_vat_report()),
+    }
+    return _json_ready(reports)
+
+
+class ResultCache:
+    """ذاكرة مؤقتة محدودة (LRU) للكشوف المعالجة مفهرسة ببصمة محتوى الملف
+
+    مشتركة بين المستأجرين: نفس الملف يُعالج مرة واحدة، مع تسجيل المستأجرين
+    الذين رفعوه حتى لا يقرأ مستأجر تقارير كشف لم يرفعه.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, reports, tenant):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'reports': reports, 'tenants': set()}
+                self._entries[key] = entry
+            entry['tenants'].add(tenant)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def grant(self, key, tenant):
+        """إضافة مستأجر إلى كشف محفوظ عند رفعه لنفس الملف (يعيد None إن لم يكن محفوظاً)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry['tenants'].add(tenant)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class JobQueueFull(Exception):
+    """تجاوز حد المهام المسموح به (على مستوى الخادم أو المستأجر)"""
+
+    def __init__(self, scope, limit):
+        super().__init__(scope)
+        self.scope = scope
+        self.limit = limit
+
+
+class JobManager:
+    """تنفيذ معالجة الكشوف في مجموعة عمال مع حدود للطابور
+
+    الرفع المتكرر لنفس الملف أثناء معالجته يشارك نفس المهمة بدلاً من تكرارها.
+    """
+
+    def __init__(self, executor, cache, max_pending=MAX_PENDING_JOBS, max_tenant_pending=MAX_TENANT_JOBS):
+        self.executor = executor
+        self.cache = cache
+        self.max_pending = max_pending
+        self.max_tenant_pending = max_tenant_pending
+        self._jobs = OrderedDict()
+        self._running = {}
+        self._tenant_pending = {}
+        self._lock = threading.Lock()
+
+    def _new_job(self, tenant, key, file_name, status):
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'tenant': tenant,
+            'statement_id': key,
+            'file_name': file_name,
+            'status': status,
+            'error': None,
+            'created': time.time(),
+            'finished': time.time() if status == 'done' else None,
+        }
+        self._jobs[job['job_id']] = job
+        while len(self._jobs) > JOB_HISTORY:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest['status'] == 'pending':
+                break
+            del self._jobs[oldest_id]
+        return job
+
+    def _check_capacity(self, tenant):
+        """رفع JobQueueFull إذا امتلأ الطابور (يُستدعى مع الاحتفاظ بالقفل)"""
+        if sum(self._tenant_pending.values()) >= self.max_pending:
+            raise JobQueueFull('server', self.max_pending)
+        if self._tenant_pending.get(tenant, 0) >= self.max_tenant_pending:
+            raise JobQueueFull('tenant', self.max_tenant_pending)
+
+    def check_capacity(self, tenant):
+        """فحص مبكر قبل استلام جسم الطلب حتى لا يُخزن ملف سيُرفض
+
+        submit يعيد الفحص لأن الطابور قد يمتلئ أثناء استلام الملف.
+        """
+        with self._lock:
+            self._check_capacity(tenant)
+
+    def submit(self, tenant, content, file_name):
+        """إنشاء مهمة معالجة (أو إرجاع نتيجة محفوظة مباشرة)"""
+        key = hashlib.sha256(content).hexdigest()
+
+        if self.cache.grant(key, tenant) is not None:
+            with self._lock:
+                return dict(self._new_job(tenant, key, file_name, 'done'))
+
+        with self._lock:
+            running = self._running.get(key)
+            if running is not None:
+                # نفس الملف قيد المعالجة: ينضم المستأجر إلى نفس المهمة
+                running['tenants'].add(tenant)
+                job = self._new_job(tenant, key, file_name, 'pending')
+                running['jobs'].append(job['job_id'])
+                return dict(job)
+
+            self._check_capacity(tenant)
+
+            job = self._new_job(tenant, key, file_name, 'pending')
+            self._running[key] = {'tenants': {tenant}, 'jobs': [job['job_id']], 'owner': tenant}
+            self._tenant_pending[tenant] = self._tenant_pending.get(tenant, 0) + 1
+
+            # نسخة قبل التنفيذ: قد تنتهي المهمة وتتغير حالتها قبل الرد على العميل
+            submitted = dict(job)
+
+        try:
+            future = self.executor.submit(process_statement, content, file_name)
+        except RuntimeError as e:
+            # مجموعة العمال مغلقة (أثناء إيقاف الخادم)
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return submitted
+
+    def _finish(self, key, future):
+        error = future.exception()
+        with self._lock:
+            running = self._running.pop(key)
+            owner = running['owner']
+            self._tenant_pending[owner] -= 1
+            if not self._tenant_pending[owner]:
+                del self._tenant_pending[owner]
+
+        if error is None:
+            reports = future.result()
+            for tenant in running['tenants']:
+                self.cache.put(key, reports, tenant)
+
+        with self._lock:
+            for job_id in running['jobs']:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['status'] = 'done' if error is None else 'failed'
+                    job['error'] = None if error is None else str(error)
+                    job['finished'] = time.time()
+
+    def job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {'pending': sum(self._tenant_pending.values()), 'max_pending': self.max_pending,
+                    'max_tenant_pending': self.max_tenant_pending,
+                    'tenants': dict(self._tenant_pending)}
+
+
+def _tenant(request):
+    return request.headers.get(TENANT_HEADER, DEFAULT_TENANT).strip() or DEFAULT_TENANT
+
+
+def _error(status_code, message, **extra):
+    return JSONResponse({'error': message, **extra}, status_code=status_code)
+
+
+def _queue_full(error):
+    message = "الخادم مشغول، أعد المحاولة لاحقاً" if error.scope == 'server' else "تجاوزت عدد المهام المسموح به للمستأجر"
+    return JSONResponse({'error': message, 'scope': error.scope, 'limit': error.limit},
+                        status_code=503 if error.scope == 'server' else 429,
+                        headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+
+def _job_response(job):
+    public = {key: value for key, value in job.items() if key != 'tenant'}
+    if job['status'] == 'done':
+        public['reports_url'] = f"/statements/{job['statement_id']}/reports"
+    return public
+
+
+async def upload_statement(request):
+    """رفع كشف حساب: جسم الطلب هو محتوى الملف واسمه في ?filename="""
+    manager = request.app.state.jobs
+    tenant = _tenant(request)
+    file_name = request.query_params.get('filename') or request.headers.get('X-Filename') or 'statement.xlsx'
+
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+        return _error(413, "حجم الملف أكبر من المسموح", max_bytes=MAX_UPLOAD_BYTES)
+
+    # رفض الطلب قبل قراءة جسمه (حتى 50 ميغابايت) إذا كان الطابور ممتلئاً
+    try:
+        manager.check_capacity(tenant)
+    except JobQueueFull as e:
+        return _queue_full(e)
+
+    content = bytearray()
+    async for chunk in request.stream():
+        content.extend(chunk)
+        if len(content) > MAX_UPLOAD_BYTES:
+            return _error(413, "حجم الملف أكبر من المسموح", max_bytes=MAX_UPLOAD_BYTES)
+    if not content:
+        return _error(400, "الملف فارغ")
+
+    try:
+        job = manager.submit(tenant, bytes(content), file_name)
+    except JobQueueFull as e:
+        return _queue_full(e)
+
+    return JSONResponse(_job_response(job), status_code=200 if job['status'] == 'done' else 202)
+
+
+async def job_status(request):
+    """حالة مهمة معالجة"""
+    job = request.app.state.jobs.job(request.path_params['job_id'])
+    if job is None or job['tenant'] != _tenant(request):
+        return _error(404, "المهمة غير موجودة")
+    return JSONResponse(_job_response(job))
+
+
+async def statement_reports(request):
+    """جميع تقارير كشف معالج، أو تقرير واحد عند تحديد اسمه"""
+    entry = request.app.state.cache.get(request.path_params['statement_id'])
+    if entry is None or _tenant(request) not in entry['tenants']:
+        return _error(404, "الكشف غير موجود أو انتهت صلاحيته، أعد رفعه")
+
+    name = request.path_params.get('report')
+    if name is None:
+        return JSONResponse(entry['reports'])
+    if name not in REPORT_NAMES:
+        return _error(404, "تقرير غير معروف", reports=REPORT_NAMES)
+    return JSONResponse(entry['reports'][name])
+
+
+async def health(request):
+    return JSONResponse({
+        'status': 'ok',
+        'workers': request.app.state.workers,
+        'cache': request.app.state.cache.stats(),
+        'jobs': request.app.state.jobs.stats(),
+    })
+
+
+def create_app(executor=None, cache_size=CACHE_SIZE, workers=WORKERS,
+               max_pending=MAX_PENDING_JOBS, max_tenant_pending=MAX_TENANT_JOBS):
+    """إنشاء تطبيق ASGI
+
+    executor اختياري: يمكن تمرير ProcessPoolExecutor لعزل المعالجة في عمليات مستقلة،
+    وإلا تُنشأ مجموعة خيوط يغلقها التطبيق عند الإيقاف.
+    """
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='statement-worker')
+    cache = ResultCache(cache_size)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        if owns_executor:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    app = Starlette(routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/statements', upload_statement, methods=['POST']),
+        Route('/jobs/{job_id}', job_status, methods=['GET']),
+        Route('/statements/{statement_id}/reports', statement_reports, methods=['GET']),
+        Route('/statements/{statement_id}/reports/{report}', statement_reports, methods=['GET']),
+    ], lifespan=lifespan)
+    app.state.cache = cache
+    app.state.jobs = JobManager(executor, cache, max_pending, max_tenant_pending)
+    app.state.workers = getattr(executor, '_max_workers', workers)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="خادم API محلي للتقارير المحاسبية")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=WORKERS, help="عدد عمال المعالجة")
+    parser.add_argument('--processes', action='store_true', help="المعالجة في عمليات مستقلة بدلاً من الخيوط")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("تشغيل الخادم يتطلب uvicorn: pip install uvicorn")
+
+    executor = None
+    if args.processes:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+    uvicorn.run(create_app(executor=executor, workers=args.workers), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,365 +1,93 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
+import io
+import uuid
+import zipfile
 import warnings
+from performance import PERF_LOG_ENABLED, PERF_LOG_PATH, PerformanceRecorder
+from statement_parsers import SUPPORTED_EXTENSIONS
 warnings.filterwarnings('ignore')
 
 # إعداد صفحة Streamlit
+# (المكتبات الثقيلة مثل pandas لا تُحمّل هنا، بل عند رفع ملف، حتى تظهر صفحة البداية فوراً)
 st.set_page_config(page_title="المحاسب الذكي", page_icon="🏦", layout="wide")
 
 st.title("🏦 النظام المحاسبي المتكامل")
 st.markdown("---")
 
-class ProfessionalAccountingSystem:
-    def __init__(self, uploaded_file):
-        self.uploaded_file = uploaded_file
-        self.df = None
-        self.journal_entries = []
-        self.accounts = {}
-        self.load_data()
-        
-    def load_data(self):
-        """تحميل البيانات من الملف المرفوع"""
-        try:
-            self.df = pd.read_excel(self.uploaded_file)
-            st.success("✅ تم تحميل البيانات بنجاح")
-            st.info(f"📊 عدد الحركات: {len(self.df)}")
-            self.clean_data()
-        except Exception as e:
-            st.error(f"❌ خطأ في تحميل الملف: {e}")
-    
-    def clean_data(self):
-        """تنظيف البيانات ومعالجتها"""
-        try:
-            # تحويل التواريخ
-            date_column = [col for col in self.df.columns if 'Date' in col or 'تاريخ' in col][0]
-            self.df['[SA]Processing Date'] = pd.to_datetime(self.df[date_column], errors='coerce')
-            
-            # البحث عن أعمدة المدين والدائن والرصيد
-            debit_col = [col for col in self.df.columns if 'مدين' in str(col)][0]
-            credit_col = [col for col in self.df.columns if 'دائن' in str(col)][0]
-            balance_col = [col for col in self.df.columns if 'الرصيد' in str(col)][0]
-            details_col = [col for col in self.df.columns if 'التفاصيل' in str(col)][0]
-            
-            # إعادة تسمية الأعمدة لتكون متوافقة مع الكود
-            self.df = self.df.rename(columns={
-                debit_col: 'مدين',
-                credit_col: 'دائن', 
-                balance_col: 'الرصيد',
-                details_col: 'التفاصيل'
-            })
-            
-            # تنظيف الأعمدة النقدية
-            numeric_columns = ['مدين', 'دائن', 'الرصيد']
-            for col in numeric_columns:
-                self.df[col] = pd.to_numeric(self.df[col], errors='coerce').fillna(0)
-            
-            # إضافة أعمدة مساعدة
-            self.df['الشهر'] = self.df['[SA]Processing Date'].dt.month
-            self.df['السنة'] = self.df['[SA]Processing Date'].dt.year
-            
-            st.success("✅ تم تنظيف البيانات بنجاح")
-            st.info(f"🔍 تم التعرف على {len(self.df)} حركة مالية")
-            
-        except Exception as e:
-            st.error(f"❌ خطأ في تنظيف البيانات: {e}")
-            st.info("📋 أسماء الأعمدة الموجودة:")
-            st.write(self.df.columns.tolist())
-    
-    def validate_data(self):
-        """التحقق من صحة البيانات"""
-        st.subheader("🔍 التحقق من البيانات")
-        
-        # عرض عينة من البيانات
-        st.write("عينة من البيانات:")
-        st.dataframe(self.df.head(10))
-        
-        # عرض إحصائيات أساسية
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("إجمالي المدين (المصروفات)", f"{self.df['مدين'].sum():,.2f} ريال")
-        
-        with col2:
-            st.metric("إجمالي الدائن (الإيرادات)", f"{self.df['دائن'].sum():,.2f} ريال")
-        
-        with col3:
-            st.metric("الرصيد النهائي", f"{self.df['الرصيد'].iloc[-1]:,.2f} ريال")
-        
-        # التحقق من وجود بيانات المصروفات
-        if self.df['مدين'].sum() == 0:
-            st.warning("⚠️ لم يتم العثور على بيانات المصروفات (المدين)")
-        else:
-            st.success(f"✅ تم العثور على {self.df['مدين'].sum():,.2f} ريال مصروفات")
-    
-    def classify_transactions(self):
-        """تصنيف الحركات إلى حسابات محاسبية"""
-        account_mapping = {
-            'تحويل داخلي صادر': 'مصاريف تشغيل',
-            'حوالة فورية محلية صادرة': 'مصاريف مشتريات',
-            'ضريبة القيمة المضافة': 'مصاريف ضرائب',
-            'رسوم تحويل': 'مصاريف بنكية',
-            'مدفوعات سداد': 'مصاريف سداد قروض',
-            'شراء محلي عبر الإنترنت': 'مصاريف مشتريات',
-            'حوالة محلية واردة': 'إيرادات عمليات',
-            'حوالة فورية محلية واردة': 'إيرادات عمليات',
-            'استرداد عملية سداد': 'إيرادات متنوعة',
-            'سحب نقدي بالريال - صراف الأهلي': 'سحوبات نقدية',
-            'تحويل داخلي وارد': 'إيرادات تحويلات',
-            'حوالة محلية واردة': 'إيرادات عمليات',
-            'حوالة فورية محلية واردة': 'إيرادات عمليات'
-        }
-        
-        self.df['الحساب المحاسبي'] = self.df['التفاصيل'].map(account_mapping)
-        self.df['الحساب المحاسبي'] = self.df['الحساب المحاسبي'].fillna('حسابات متنوعة')
-        
-        # عرض توزيع الحسابات
-        st.info("📊 توزيع الحركات على الحسابات:")
-        account_distribution = self.df['الحساب المحاسبي'].value_counts()
-        st.write(account_distribution)
-    
-    def create_journal_entries(self):
-        """إنشاء قيود اليومية"""
-        with st.spinner('📖 جاري إنشاء قيود اليومية...'):
-            for index, row in self.df.iterrows():
-                date = row['[SA]Processing Date']
-                description = row['التفاصيل']
-                debit = row['مدين']
-                credit = row['دائن']
-                account = row.get('الحساب المحاسبي', 'حسابات متنوعة')
-                
-                if debit > 0:
-                    entry = {
-                        'التاريخ': date,
-                        'الحساب المدين': account,
-                        'المبلغ المدين': debit,
-                        'الحساب الدائن': 'البنك',
-                        'المبلغ الدائن': 0,
-                        'الوصف': description
-                    }
-                    self.journal_entries.append(entry)
-                    
-                if credit > 0:
-                    entry = {
-                        'التاريخ': date,
-                        'الحساب المدين': 'البنك',
-                        'المبلغ المدين': 0,
-                        'الحساب الدائن': account,
-                        'المبلغ الدائن': credit,
-                        'الوصف': description
-                    }
-                    self.journal_entries.append(entry)
-        
-        journal_df = pd.DataFrame(self.journal_entries)
-        return journal_df
+def show_data_validation(accounting_system):
+    """التحقق من صحة البيانات"""
+    from money import decimal_frame, format_amount
     
-    def generate_trial_balance(self):
-        """إنشاء ميزان المراجعة"""
-        with st.spinner('⚖️ جاري إنشاء ميزان المراجعة...'):
-            if not self.journal_entries:
-                self.create_journal_entries()
-            
-            trial_balance = {}
-            
-            for entry in self.journal_entries:
-                debit_account = entry['الحساب المدين']
-                credit_account = entry['الحساب الدائن']
-                debit_amount = entry['المبلغ المدين']
-                credit_amount = entry['المبلغ الدائن']
-                
-                if debit_account not in trial_balance:
-                    trial_balance[debit_account] = {'مدين': 0, 'دائن': 0}
-                trial_balance[debit_account]['مدين'] += debit_amount
-                
-                if credit_account not in trial_balance:
-                    trial_balance[credit_account] = {'مدين': 0, 'دائن': 0}
-                trial_balance[credit_account]['دائن'] += credit_amount
-            
-            tb_data = []
-            for account, balances in trial_balance.items():
-                balance = balances['مدين'] - balances['دائن']
-                tb_data.append({
-                    'الحساب': account,
-                    'مجموع المدين': balances['مدين'],
-                    'مجموع الدائن': balances['دائن'],
-                    'الرصيد': balance
-                })
-            
-            trial_balance_df = pd.DataFrame(tb_data)
-            return trial_balance_df
+    st.subheader("🔍 التحقق من البيانات")
     
-    def generate_income_statement(self):
-        """إنشاء قائمة الدخل"""
-        with st.spinner('📈 جاري إنشاء قائمة الدخل...'):
-            revenue_accounts = ['إيرادات عمليات', 'إيرادات تحويلات', 'إيرادات متنوعة']
-            total_revenue = self.df[self.df['الحساب المحاسبي'].isin(revenue_accounts)]['دائن'].sum()
-            
-            expense_accounts = ['مصاريف تشغيل', 'مصاريف مشتريات', 'مصاريف ضرائب', 'مصاريف بنكية', 'مصاريف سداد قروض']
-            total_expenses = self.df[self.df['الحساب المحاسبي'].isin(expense_accounts)]['مدين'].sum()
-            
-            net_income = total_revenue - total_expenses
-            
-            income_statement = {
-                'الإيرادات': {
-                    'إيرادات العمليات': self.df[self.df['الحساب المحاسبي'] == 'إيرادات عمليات']['دائن'].sum(),
-                    'إيرادات التحويلات': self.df[self.df['الحساب المحاسبي'] == 'إيرادات تحويلات']['دائن'].sum(),
-                    'إيرادات متنوعة': self.df[self.df['الحساب المحاسبي'] == 'إيرادات متنوعة']['دائن'].sum(),
-                    'إجمالي الإيرادات': total_revenue
-                },
-                'المصروفات': {
-                    'مصاريف تشغيل': self.df[self.df['الحساب المحاسبي'] == 'مصاريف تشغيل']['مدين'].sum(),
-                    'مصاريف مشتريات': self.df[self.df['الحساب المحاسبي'] == 'مصاريف مشتريات']['مدين'].sum(),
-                    'مصاريف ضرائب': self.df[self.df['الحساب المحاسبي'] == 'مصاريف ضرائب']['مدين'].sum(),
-                    'مصاريف بنكية': self.df[self.df['الحساب المحاسبي'] == 'مصاريف بنكية']['مدين'].sum(),
-                    'مصاريف سداد قروض': self.df[self.df['الحساب المحاسبي'] == 'مصاريف سداد قروض']['مدين'].sum(),
-                    'إجمالي المصروفات': total_expenses
-                },
-                'صافي الدخل': net_income
-            }
-            
-            return income_statement
+    # عرض عينة من البيانات
+    st.write("عينة من البيانات:")
+    st.dataframe(decimal_frame(accounting_system.df.head(10)))
     
-    def generate_cash_flow_statement(self):
-        """إنشاء قائمة التدفقات النقدية"""
-        with st.spinner('💸 جاري إنشاء قائمة التدفقات النقدية...'):
-            operating_activities = self.df[self.df['الحساب المحاسبي'].isin([
-                'إيرادات عمليات', 'مصاريف تشغيل', 'مصاريف مشتريات'
-            ])]
-            
-            cash_from_operations = (
-                operating_activities['دائن'].sum() - 
-                operating_activities['مدين'].sum()
-            )
-            
-            financing_activities = self.df[self.df['الحساب المحاسBI'].isin([
-                'مصاريف سداد قروض', 'إيرادات تحويلات'
-            ])]
-            
-            cash_from_financing = (
-                financing_activities['دائن'].sum() - 
-                financing_activities['مدين'].sum()
-            )
-            
-            net_cash_change = self.df['دائن'].sum() - self.df['مدين'].sum()
-            opening_balance = self.df['الرصيد'].iloc[-1] - net_cash_change
-            
-            cash_flow_statement = {
-                'التدفقات النقدية من الأنشطة التشغيلية': cash_from_operations,
-                'التدفقات النقدية من الأنشطة التمويلية': cash_from_financing,
-                'صافي الزيادة (النقص) في النقد': net_cash_change,
-                'الرصيد النقدي في بداية الفترة': opening_balance,
-                'الرصيد النقدي في نهاية الفترة': self.df['الرصيد'].iloc[-1]
-            }
-            
-            return cash_flow_statement
+    # عرض إحصائيات أساسية
+    col1, col2, col3 = st.columns(3)
     
-    def generate_balance_sheet(self):
-        """إنشاء الميزانية العمومية"""
-        with st.spinner('🏦 جاري إنشاء الميزانية العمومية...'):
-            cash_balance = self.df['الرصيد'].iloc[-1]
-            income_statement = self.generate_income_statement()
-            net_income = income_statement['صافي الدخل']
-            
-            balance_sheet = {
-                'الأصول': {
-                    'النقد والبنك': cash_balance,
-                    'إجمالي الأصول': cash_balance
-                },
-                'الخصوم': {
-                    'إجمالي الخصوم': 0
-                },
-                'حقوق الملكية': {
-                    'صافي الدخل': net_income,
-                    'إجمالي حقوق الملكية': net_income
-                }
-            }
-            
-            balance_sheet['الخصوم']['إجمالي الخصوم'] = cash_balance - net_income
-            
-            return balance_sheet
+    with col1:
+        st.metric("إجمالي المدين (المصروفات)", f"{format_amount(accounting_system.df['مدين'].sum())} ريال")
     
-    def generate_expense_analysis(self):
-        """تحليل المصروفات التفصيلي"""
-        with st.spinner('📊 جاري إنشاء تحليل المصروفات...'):
-            expense_data = self.df[self.df['مدين'] > 0].copy()
-            
-            if not expense_data.empty:
-                expense_analysis = expense_data.groupby('الحساب المحاسبي').agg({
-                    'مدين': ['sum', 'count', 'mean', 'max']
-                }).round(2)
-                
-                expense_analysis.columns = ['إجمالي المصروفات', 'عدد الحركات', 'متوسط المبلغ', 'أعلى مبلغ']
-                
-                # إضافة تحليل إضافي
-                st.subheader("📋 تفصيل المصروفات")
-                for account in expense_analysis.index:
-                    total = expense_analysis.loc[account, 'إجمالي المصروفات']
-                    count = expense_analysis.loc[account, 'عدد الحركات']
-                    st.write(f"**{account}**: {total:,.2f} ريال ({count} حركة)")
-            else:
-                expense_analysis = pd.DataFrame()
-                st.info("لا توجد بيانات للمصروفات")
-            
-            return expense_analysis
+    with col2:
+        st.metric("إجمالي الدائن (الإيرادات)", f"{format_amount(accounting_system.df['دائن'].sum())} ريال")
     
-    def generate_revenue_analysis(self):
-        """تحليل الإيرادات التفصيلي"""
-        with st.spinner('📈 جاري إنشاء تحليل الإيرادات...'):
-            revenue_data = self.df[self.df['دائن'] > 0].copy()
-            
-            if not revenue_data.empty:
-                revenue_analysis = revenue_data.groupby('الحساب المحاسبي').agg({
-                    'دائن': ['sum', 'count', 'mean', 'max']
-                }).round(2)
-                
-                revenue_analysis.columns = ['إجمالي الإيرادات', 'عدد الحركات', 'متوسط المبلغ', 'أعلى مبلغ']
-                
-                # إضافة تحليل إضافي
-                st.subheader("📋 تفصيل الإيرادات")
-                for account in revenue_analysis.index:
-                    total = revenue_analysis.loc[account, 'إجمالي الإيرادات']
-                    count = revenue_analysis.loc[account, 'عدد الحركات']
-                    st.write(f"**{account}**: {total:,.2f} ريال ({count} حركة)")
-            else:
-                revenue_analysis = pd.DataFrame()
-                st.info("لا توجد بيانات للإيرادات")
-            
-            return revenue_analysis
+    with col3:
+        st.metric("الرصيد النهائي", f"{format_amount(accounting_system.df['الرصيد'].iloc[-1])} ريال")
     
-    def generate_monthly_reports(self):
-        """إنشاء تقارير شهرية"""
-        with st.spinner('📅 جاري إنشاء التقارير الشهرية...'):
-            monthly_data = self.df.groupby(['السنة', 'الشهر']).agg({
-                'مدين': 'sum',
-                'دائن': 'sum',
-                'الرصيد': 'last'
-            }).reset_index()
-            
-            monthly_data['صافي التدفق'] = monthly_data['دائن'] - monthly_data['مدين']
-            
-            # إضافة أسماء الأشهر
-            month_names = {
-                1: 'يناير', 2: 'فبراير', 3: 'مارس', 4: 'أبريل', 
-                5: 'مايو', 6: 'يونيو', 7: 'يوليو', 8: 'أغسطس',
-                9: 'سبتمبر', 10: 'أكتوبر', 11: 'نوفمبر', 12: 'ديسمبر'
-            }
-            monthly_data['اسم الشهر'] = monthly_data['الشهر'].map(month_names)
-            
-            return monthly_data
+    # التحقق من وجود بيانات المصروفات
+    if accounting_system.df['مدين'].sum() == 0:
+        st.warning("⚠️ لم يتم العثور على بيانات المصروفات (المدين)")
+    else:
+        st.success(f"✅ تم العثور على {format_amount(accounting_system.df['مدين'].sum())} ريال مصروفات")
+
+def show_performance_panel(recorder):
+    """لوحة الأداء في الشريط الجانبي (مخفية، تظهر عند إضافة ?perf=1 إلى الرابط)"""
+    with st.sidebar.expander("⏱️ نتائج الأداء", expanded=True):
+        if not recorder.records:
+            st.caption("لا توجد قياسات بعد")
+            return
+        
+        st.dataframe(recorder.summary(), use_container_width=True)
+        total_seconds = sum(record['seconds'] for record in recorder.records if record['parent'] is None)
+        st.caption(f"إجمالي زمن المراحل: {total_seconds:,.3f} ثانية | الجلسة: {recorder.session_id[:8]}")
+        
+        for record in recorder.records:
+            if 'profile' in record:
+                st.caption(f"cProfile: {record['stage']}")
+                st.code(record['profile'])
 
 # واجهة Streamlit
 def main():
     st.sidebar.title("📁 رفع الملف")
-    uploaded_file = st.sidebar.file_uploader("اختر ملف كشف الحساب البنكي (Excel)", type=['xlsx', 'xls'])
+    uploaded_file = st.sidebar.file_uploader("اختر ملف كشف الحساب البنكي (Excel أو CSV أو MT940 أو CAMT.053)", type=SUPPORTED_EXTENSIONS)
+    
+    # إعدادات قياس الأداء
+    show_performance = st.query_params.get('perf') == '1'
+    profile = trace_memory = False
+    if show_performance:
+        with st.sidebar.expander("⏱️ إعدادات قياس الأداء"):
+            profile = st.checkbox("تفعيل cProfile", key='perf_profile')
+            trace_memory = st.checkbox("تتبع الذاكرة (tracemalloc)", key='perf_memory')
+    
+    session_id = st.session_state.setdefault('perf_session_id', uuid.uuid4().hex)
+    log_path = PERF_LOG_PATH if show_performance or PERF_LOG_ENABLED else None
+    recorder = PerformanceRecorder(session_id=session_id, profile=profile, trace_memory=trace_memory, log_path=log_path)
     
     if uploaded_file is not None:
+        import pandas as pd
+        from accounting_engine import ProfessionalAccountingSystem
+        from money import decimal_frame, format_amount, to_riyals
+        from pdf_reports import render_statement_pdf, statements_of
+        from report_export import EXPORT_FORMATS, export_reports
+        
         try:
             # إنشاء النظام المحاسبي
-            accounting_system = ProfessionalAccountingSystem(uploaded_file)
+            accounting_system = ProfessionalAccountingSystem(uploaded_file, performance=recorder, ui=st)
             
             # التحقق من البيانات أولاً
-            accounting_system.validate_data()
+            show_data_validation(accounting_system)
             
             # تصنيف الحركات
             accounting_system.classify_transactions()
@@ -373,13 +101,13 @@ def main():
                 if st.button("📖 قيود اليومية", use_container_width=True):
                     journal_entries = accounting_system.create_journal_entries()
                     st.subheader("قيود اليومية")
-                    st.dataframe(journal_entries, use_container_width=True)
+                    st.dataframe(decimal_frame(journal_entries), use_container_width=True)
             
             with col2:
                 if st.button("⚖️ ميزان المراجعة", use_container_width=True):
                     trial_balance = accounting_system.generate_trial_balance()
                     st.subheader("ميزان المراجعة")
-                    st.dataframe(trial_balance, use_container_width=True)
+                    st.dataframe(decimal_frame(trial_balance), use_container_width=True)
             
             with col3:
                 if st.button("📈 قائمة الدخل", use_container_width=True):
@@ -390,25 +118,25 @@ def main():
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
-                        st.metric("إجمالي الإيرادات", f"{income_statement['الإيرادات']['إجمالي الإيرادات']:,.2f} ريال")
+                        st.metric("إجمالي الإيرادات", f"{format_amount(income_statement['الإيرادات']['إجمالي الإيرادات'])} ريال")
                     
                     with col2:
-                        st.metric("إجمالي المصروفات", f"{income_statement['المصروفات']['إجمالي المصروفات']:,.2f} ريال")
+                        st.metric("إجمالي المصروفات", f"{format_amount(income_statement['المصروفات']['إجمالي المصروفات'])} ريال")
                     
                     with col3:
-                        st.metric("صافي الدخل", f"{income_statement['صافي الدخل']:,.2f} ريال", 
-                                 delta=f"{income_statement['صافي الدخل']:,.2f}")
+                        st.metric("صافي الدخل", f"{format_amount(income_statement['صافي الدخل'])} ريال", 
+                                 delta=f"{format_amount(income_statement['صافي الدخل'])}")
                     
                     # تفصيل الإيرادات والمصروفات
                     st.subheader("تفصيل الإيرادات")
                     for revenue_type, amount in income_statement['الإيرادات'].items():
                         if revenue_type != 'إجمالي الإيرادات':
-                            st.write(f"• {revenue_type}: {amount:,.2f} ريال")
+                            st.write(f"• {revenue_type}: {format_amount(amount)} ريال")
                     
                     st.subheader("تفصيل المصروفات")
                     for expense_type, amount in income_statement['المصروفات'].items():
                         if expense_type != 'إجمالي المصروفات':
-                            st.write(f"• {expense_type}: {amount:,.2f} ريال")
+                            st.write(f"• {expense_type}: {format_amount(amount)} ريال")
             
             col4, col5, col6 = st.columns(3)
             
@@ -418,7 +146,7 @@ def main():
                     st.subheader("قائمة التدفقات النقدية")
                     
                     for item, value in cash_flow.items():
-                        st.metric(item, f"{value:,.2f} ريال")
+                        st.metric(item, f"{format_amount(value)} ريال")
             
             with col5:
                 if st.button("🏦 الميزانية العمومية", use_container_width=True):
@@ -430,39 +158,95 @@ def main():
                     with col1:
                         st.write("**الأصول**")
                         for item, value in balance_sheet['الأصول'].items():
-                            st.metric(item, f"{value:,.2f} ريال")
+                            st.metric(item, f"{format_amount(value)} ريال")
                     
                     with col2:
                         st.write("**الخصوم وحقوق الملكية**")
                         for item, value in balance_sheet['الخصوم'].items():
-                            st.metric(item, f"{value:,.2f} ريال")
+                            st.metric(item, f"{format_amount(value)} ريال")
                         for item, value in balance_sheet['حقوق الملكية'].items():
-                            st.metric(item, f"{value:,.2f} ريال")
+                            st.metric(item, f"{format_amount(value)} ريال")
             
             with col6:
                 if st.button("📊 تحليل المصروفات", use_container_width=True):
                     expense_analysis = accounting_system.generate_expense_analysis()
                     st.subheader("تحليل المصروفات")
                     if not expense_analysis.empty:
-                        st.dataframe(expense_analysis, use_container_width=True)
+                        st.dataframe(decimal_frame(expense_analysis), use_container_width=True)
+                        
+                        # إضافة تحليل إضافي
+                        st.subheader("📋 تفصيل المصروفات")
+                        for account in expense_analysis.index:
+                            total = expense_analysis.loc[account, 'إجمالي المصروفات']
+                            count = expense_analysis.loc[account, 'عدد الحركات']
+                            st.write(f"**{account}**: {format_amount(total)} ريال ({count} حركة)")
+                    else:
+                        st.info("لا توجد بيانات للمصروفات")
             
             # تحليل الإيرادات
             if st.button("📈 تحليل الإيرادات", use_container_width=True):
                 revenue_analysis = accounting_system.generate_revenue_analysis()
                 st.subheader("تحليل الإيرادات")
                 if not revenue_analysis.empty:
-                    st.dataframe(revenue_analysis, use_container_width=True)
+                    st.dataframe(decimal_frame(revenue_analysis), use_container_width=True)
+                    
+                    # إضافة تحليل إضافي
+                    st.subheader("📋 تفصيل الإيرادات")
+                    for account in revenue_analysis.index:
+                        total = revenue_analysis.loc[account, 'إجمالي الإيرادات']
+                        count = revenue_analysis.loc[account, 'عدد الحركات']
+                        st.write(f"**{account}**: {format_amount(total)} ريال ({count} حركة)")
+                else:
+                    st.info("لا توجد بيانات للإيرادات")
+            
+            # الرسوم وضريبة القيمة المضافة
+            if st.button("🧾 الرسوم وضريبة القيمة المضافة", use_container_width=True):
+                transfer_cost_report = accounting_system.generate_transfer_costs()
+                vat_report = accounting_system.generate_vat_report()
+                st.subheader("الرسوم وضريبة القيمة المضافة")
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("إجمالي الرسوم البنكية", f"{format_amount(vat_report['إجمالي الرسوم'].sum())} ريال")
+                with col2:
+                    st.metric("إجمالي ضريبة القيمة المضافة", f"{format_amount(vat_report['إجمالي الضريبة'].sum())} ريال")
+                with col3:
+                    st.metric("حركات غير مرتبطة بحوالة", f"{int(vat_report['حركات غير مرتبطة'].sum())}")
+                
+                st.write("**ملخص الضريبة الشهري**")
+                st.dataframe(decimal_frame(vat_report), use_container_width=True)
+                st.write("**التكلفة الفعلية لكل حوالة**")
+                st.dataframe(decimal_frame(transfer_cost_report), use_container_width=True)
             
             # التقارير الشهرية
             if st.button("📅 التقارير الشهرية", use_container_width=True):
                 monthly_reports = accounting_system.generate_monthly_reports()
                 st.subheader("التقارير الشهرية")
-                st.dataframe(monthly_reports, use_container_width=True)
+                st.dataframe(decimal_frame(monthly_reports), use_container_width=True)
                 
                 # رسم بياني للتغير الشهري
                 st.subheader("📈 التغير الشهري في التدفقات النقدية")
                 monthly_reports['الفترة'] = monthly_reports['اسم الشهر'] + ' ' + monthly_reports['السنة'].astype(str)
-                st.line_chart(monthly_reports.set_index('الفترة')[['مدين', 'دائن', 'صافي التدفق']])
+                st.line_chart(to_riyals(monthly_reports.set_index('الفترة')[['مدين', 'دائن', 'صافي التدفق']]))
+            
+            # توقع التدفقات النقدية: مفتاح تبديل (لا زر) حتى يبقى التوقع ظاهراً عند تحريك المنزلق،
+            # وإعادة الرسم بعدد أشهر مختلف تستخدم النموذج المحفوظ في forecasting
+            if st.toggle("🔮 توقع التدفقات النقدية", key='show_forecast'):
+                forecast_months = st.slider("🔮 عدد أشهر التوقع", min_value=1, max_value=12, value=3, key='forecast_months')
+                cash_flow_forecast, history = accounting_system.generate_cash_flow_forecast(forecast_months)
+                st.subheader("توقع التدفقات النقدية")
+                st.dataframe(decimal_frame(cash_flow_forecast, list(cash_flow_forecast.columns)), use_container_width=True)
+                
+                st.subheader("📈 صافي التدفق الفعلي والمتوقع")
+                chart = pd.DataFrame({
+                    'فعلي': history.sum(axis=1),
+                    'متوقع': cash_flow_forecast['صافي التدفق'],
+                })
+                chart.index = chart.index.astype(str)
+                st.line_chart(to_riyals(chart))
+                
+                st.metric(f"🏦 الرصيد المتوقع بعد {forecast_months} شهر",
+                          f"{format_amount(cash_flow_forecast['الرصيد المتوقع'].iloc[-1])} ريال")
             
             # ملخص سريع
             st.markdown("---")
@@ -475,27 +259,60 @@ def main():
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric("💰 إجمالي الإيرادات", f"{income['الإيرادات']['إجمالي الإيرادات']:,.2f} ريال")
-                st.metric("💸 إجمالي المصروفات", f"{income['المصروفات']['إجمالي المصروفات']:,.2f} ريال")
+                st.metric("💰 إجمالي الإيرادات", f"{format_amount(income['الإيرادات']['إجمالي الإيرادات'])} ريال")
+                st.metric("💸 إجمالي المصروفات", f"{format_amount(income['المصروفات']['إجمالي المصروفات'])} ريال")
             
             with col2:
-                st.metric("📈 صافي الدخل", f"{income['صافي الدخل']:,.2f} ريال")
-                st.metric("🏦 الرصيد النهائي", f"{cash_flow['الرصيد النقدي في نهاية الفترة']:,.2f} ريال")
+                st.metric("📈 صافي الدخل", f"{format_amount(income['صافي الدخل'])} ريال")
+                st.metric("🏦 الرصيد النهائي", f"{format_amount(cash_flow['الرصيد النقدي في نهاية الفترة'])} ريال")
             
             with col3:
-                st.metric("💳 التدفق النقدي الصافي", f"{cash_flow['صافي الزيادة (النقص) في النقد']:,.2f} ريال")
-                st.metric("📊 إجمالي الأصول", f"{balance_sheet['الأصول']['إجمالي الأصول']:,.2f} ريال")
+                st.metric("💳 التدفق النقدي الصافي", f"{format_amount(cash_flow['صافي الزيادة (النقص) في النقد'])} ريال")
+                st.metric("📊 إجمالي الأصول", f"{format_amount(balance_sheet['الأصول']['إجمالي الأصول'])} ريال")
             
             with col4:
                 st.metric("📋 عدد الحركات", f"{len(accounting_system.df)}")
                 st.metric("📅 الفترة الزمنية", f"{accounting_system.df['[SA]Processing Date'].min().strftime('%Y-%m-%d')} إلى {accounting_system.df['[SA]Processing Date'].max().strftime('%Y-%m-%d')}")
+            
+            # تصدير التقارير
+            st.markdown("---")
+            st.subheader("📥 تصدير التقارير")
+            
+            export_format = st.selectbox(
+                "صيغة التصدير",
+                list(EXPORT_FORMATS),
+                format_func=lambda fmt: {'xlsx': 'Excel (مصنف متعدد الأوراق)', 'csv': 'CSV (أرشيف مضغوط)', 'parquet': 'Parquet (أرشيف مضغوط)'}[fmt]
+            )
+            
+            if st.button("📥 تجهيز ملف التصدير", use_container_width=True):
+                with st.spinner('📥 جاري تصدير التقارير...'):
+                    export_buffer = io.BytesIO()
+                    export_reports(accounting_system, export_buffer, export_format)
+                
+                file_name, mime = EXPORT_FORMATS[export_format]
+                st.download_button("⬇️ تحميل الملف", data=export_buffer.getvalue(),
+                                   file_name=file_name, mime=mime, use_container_width=True)
+            
+            if st.button("🖨️ القوائم المالية (PDF)", use_container_width=True):
+                with st.spinner('🖨️ جاري إنشاء ملفات PDF...'):
+                    pdf_buffer = io.BytesIO()
+                    with zipfile.ZipFile(pdf_buffer, 'w') as archive:
+                        for kind, statement in statements_of(accounting_system):
+                            archive.writestr(f'{kind}.pdf', render_statement_pdf(kind, statement))
+                
+                st.download_button("⬇️ تحميل القوائم المالية", data=pdf_buffer.getvalue(),
+                                   file_name='القوائم_المالية_pdf.zip', mime='application/zip',
+                                   use_container_width=True)
                 
         except Exception as e:
             st.error(f"❌ حدث خطأ: {e}")
-            st.info("💡 تأكد من أن ملف Excel يحتوي على الأعمدة التالية: تاريخ، مدين، دائن، الرصيد")
+            st.info("💡 تأكد من أن ملف Excel أو CSV يحتوي على الأعمدة التالية: تاريخ، التفاصيل، مدين، دائن، الرصيد")
+        
+        if show_performance:
+            show_performance_panel(recorder)
     
     else:
-        st.info("👆 يرجى رفع ملف كشف الحساب البنكي (Excel) لبدء التحليل")
+        st.info("👆 يرجى رفع ملف كشف الحساب البنكي (Excel أو CSV أو MT940 أو CAMT.053) لبدء التحليل")
         
         st.markdown("""
         ### 📋 الميزات المتاحة:
@@ -506,7 +323,11 @@ def main():
         - 🏦 الميزانية العمومية
         - 📊 تحليل المصروفات والإيرادات
         - 📅 تقارير شهرية
+        - 🧾 ربط الرسوم والضريبة بالحوالات وملخص ضريبة القيمة المضافة
+        - 🔮 توقع التدفقات النقدية والرصيد للأشهر القادمة
         - 📋 ملخص سريع للأداء المالي
+        - 📥 تصدير جميع التقارير إلى Excel أو CSV أو Parquet
+        - 🖨️ نسخ PDF من القوائم المالية
         """)
 
 if __name__ == "__main__":
@@ -0,0 +1,357 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+BASELINE_FILE = 'benchmark_baselines.json'
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# أنواع الحركات الأساسية ونسبها ونطاق مبالغها (لوغاريتمي) كما في كشف البنك الأهلي الفعلي
+# (التفاصيل، النسبة، الجهة، الوسيط، أدنى مبلغ، أعلى مبلغ، يتبعها رسوم وضريبة)
+TRANSACTION_TYPES = [
+    ('حوالة فورية محلية صادرة', 165, 'مدين', 1700.0, 100.0, 20000.0, True),
+    ('تحويل داخلي صادر', 130, 'مدين', 1000.0, 24.73, 100000.0, False),
+    ('مدفوعات سداد', 72, 'مدين', 1650.0, 25.0, 76446.61, False),
+    ('حوالة محلية واردة', 16, 'دائن', 106375.0, 21000.0, 230000.0, False),
+    ('شراء محلي عبر الإنترنت', 13, 'مدين', 28.75, 28.75, 1015.33, False),
+    ('تحويل داخلي وارد', 12, 'دائن', 11500.0, 1000.0, 75000.0, False),
+    ('استرداد عملية سداد', 9, 'دائن', 1650.0, 1150.0, 2775.0, False),
+    ('حوالة فورية محلية واردة', 4, 'دائن', 10216.4, 8000.0, 15000.0, False),
+    ('حوالة صادرة', 4, 'مدين', 147.45, 129.61, 282.57, False),
+    ('تصحيح قيد', 2, 'مدين', 0.29, 0.08, 0.5, False),
+    ('سحب نقدي بالريال - صراف الأهلي', 1, 'مدين', 500.0, 500.0, 500.0, False),
+    ('إعادة ضريبة القيمة المضافة', 1, 'دائن', 0.15, 0.15, 0.15, False),
+    ('عكس رسوم تحويل', 1, 'دائن', 1.0, 1.0, 1.0, False),
+    ('إعادة حوالة فورية محلية صادرة', 1, 'دائن', 1675.0, 1675.0, 1675.0, False),
+    ('حوالة محلية صادرة', 1, 'مدين', 40000.0, 40000.0, 40000.0, False),
+]
+
+# نسبة الحوالات الفورية الصادرة التي تتبعها رسوم تحويل وضريبة قيمة مضافة (147 من 165 في العينة)
+FEE_PROBABILITY = 147 / 165
+TRANSFER_FEE = 1.0
+VAT_RATE = 0.15
+
+DESCRIPTIONS = {
+    'حوالة فورية محلية صادرة': 'شراء بضاعة مندوبين Charges: 1.00 REMBK:THE SAUDI NATIONAL BANK',
+    'تحويل داخلي صادر': 'حسابي في بنك اخر BEN ID:1060146055',
+    'رسوم تحويل': 'CITY:Digital Channel',
+    'ضريبة القيمة المضافة': 'CITY:Digital Channel CITY:Digital Channel',
+}
+
+PIPELINE_STAGES = [
+    'read_statement',
+    'clean_data',
+    'classify_transactions',
+    'create_journal_entries',
+    'generate_trial_balance',
+    'generate_income_statement',
+    'generate_cash_flow_statement',
+    'generate_balance_sheet',
+    'generate_expense_analysis',
+    'generate_revenue_analysis',
+    'generate_monthly_reports',
+    'link_fees_and_vat',
+    'generate_transfer_costs',
+    'generate_vat_report',
+    'generate_cash_flow_forecast',
+]
+
+
+def generate_statement(rows, seed=0, rows_per_day=8, opening_balance=50000.0):
+    """إنشاء كشف حساب بنكي صناعي بنفس أعمدة كشف البنك الأهلي
+
+    الحوالات الفورية الصادرة يتبعها (باحتمال FEE_PROBABILITY) سطرا رسوم تحويل
+    وضريبة قيمة مضافة بنفس المرجع، والكشف مرتب تنازلياً بالتاريخ كالملف الأصلي.
+    """
+    rng = np.random.default_rng(seed)
+
+    names = np.array([t[0] for t in TRANSACTION_TYPES])
+    weights = np.array([t[1] for t in TRANSACTION_TYPES], dtype=float)
+    weights /= weights.sum()
+    is_debit = np.array([t[2] == 'مدين' for t in TRANSACTION_TYPES])
+    medians = np.array([t[3] for t in TRANSACTION_TYPES])
+    lows = np.array([t[4] for t in TRANSACTION_TYPES])
+    highs = np.array([t[5] for t in TRANSACTION_TYPES])
+    has_fees = np.array([t[6] for t in TRANSACTION_TYPES])
+
+    # كل حركة أساسية تنتج سطراً واحداً أو ثلاثة أسطر (الحركة + الرسوم + الضريبة)
+    expected_lines = 1 + 2 * (weights[has_fees].sum() * FEE_PROBABILITY)
+    base_count = int(rows / expected_lines) + 16
+    kinds = rng.choice(len(TRANSACTION_TYPES), size=base_count, p=weights)
+    with_fees = has_fees[kinds] & (rng.random(base_count) < FEE_PROBABILITY)
+
+    amounts = np.exp(rng.normal(np.log(medians[kinds]), 0.9))
+    amounts = np.clip(amounts, lows[kinds], highs[kinds]).round(2)
+    references = rng.integers(100_000_000, 130_000_000, size=base_count).astype(float)
+
+    repeats = np.where(with_fees, 3, 1)
+    base_index = np.repeat(np.arange(base_count), repeats)
+    # موضع السطر داخل مجموعته: 0 للحركة، 1 للرسوم، 2 للضريبة
+    slot = np.arange(len(base_index)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    base_index, slot = base_index[:rows], slot[:rows]
+
+    details = names[kinds[base_index]].astype(object)
+    details[slot == 1] = 'رسوم تحويل'
+    details[slot == 2] = 'ضريبة القيمة المضافة'
+
+    line_amounts = amounts[base_index]
+    line_amounts[slot == 1] = TRANSFER_FEE
+    line_amounts[slot == 2] = round(TRANSFER_FEE * VAT_RATE, 2)
+    line_is_debit = is_debit[kinds[base_index]] | (slot > 0)
+
+    signed = np.where(line_is_debit, -line_amounts, line_amounts)
+    balance = (opening_balance + np.cumsum(signed)).round(2)
+
+    # الرسوم والضريبة تحمل تاريخ الحركة الأصلية نفسه
+    dates = np.datetime64('2025-01-01') + (base_index // rows_per_day).astype('timedelta64[D]')
+
+    descriptions = np.array([DESCRIPTIONS.get(name, '') for name in names], dtype=object)
+    line_descriptions = descriptions[kinds[base_index]]
+    line_descriptions[slot == 1] = DESCRIPTIONS['رسوم تحويل']
+    line_descriptions[slot == 2] = DESCRIPTIONS['ضريبة القيمة المضافة']
+
+    notes = np.full(len(base_index), np.nan, dtype=object)
+    notes[slot == 1] = '9M'
+    notes[(slot == 0) & with_fees[base_index]] = 'JM'
+
+    df = pd.DataFrame({
+        '[SA]Processing Date': dates,
+        'التفاصيل': details,
+        'الوصف': line_descriptions,
+        'تفاصيل إضافية': np.nan,
+        'المرجع': references[base_index],
+        'ملاحظات': notes,
+        'مدين': np.where(line_is_debit, signed, np.nan),
+        'دائن': np.where(line_is_debit, np.nan, signed),
+        'الرصيد': balance,
+    })
+    # الكشف الفعلي يعرض أحدث الحركات أولاً
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def _chronological_amounts(statement):
+    """الحركات بالترتيب الزمني مع المبلغ بإشارته والرصيد الافتتاحي"""
+    rows = statement.iloc[::-1]
+    amounts = rows['مدين'].fillna(0) + rows['دائن'].fillna(0)
+    opening = round(float(rows['الرصيد'].iloc[0] - amounts.iloc[0]), 2)
+    return rows, amounts, opening
+
+
+def write_xlsx(statement):
+    buffer = io.BytesIO()
+    statement.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def write_csv(statement):
+    return statement.to_csv(index=False).encode('utf-8-sig')
+
+
+def write_mt940(statement):
+    """نفس الكشف بصيغة SWIFT MT940 (نوع العملية والوصف في حقل :86:)"""
+    rows, amounts, opening = _chronological_amounts(statement)
+
+    def swift_amount(value):
+        return f"{abs(value):.2f}".replace('.', ',')
+
+    dates = rows['[SA]Processing Date'].dt.strftime('%y%m%d')
+    lines = [':20:BENCHMARK', ':25:SA0000000000000000000000', ':28C:1',
+             f":60F:{'D' if opening < 0 else 'C'}{dates.iloc[0]}SAR{swift_amount(opening)}"]
+    for date, details, description, reference, amount in zip(
+        dates, rows['التفاصيل'], rows['الوصف'], rows['المرجع'], amounts
+    ):
+        lines.append(f":61:{date}{'D' if amount < 0 else 'C'}{swift_amount(amount)}NTRF{int(reference)}")
+        lines.append(f":86:{details}/{description}")
+    closing = float(rows['الرصيد'].iloc[-1])
+    lines.append(f":62F:{'D' if closing < 0 else 'C'}{dates.iloc[-1]}SAR{swift_amount(closing)}")
+    lines.append('-}')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def write_camt053(statement):
+    """نفس الكشف بصيغة ISO 20022 CAMT.053"""
+    rows, amounts, opening = _chronological_amounts(statement)
+    dates = rows['[SA]Processing Date'].dt.strftime('%Y-%m-%d')
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt><Id>BENCHMARK</Id>',
+        f'<Bal><Tp><CdOrPrtry><Cd>OPBD</Cd></CdOrPrtry></Tp><Amt Ccy="SAR">{abs(opening):.2f}</Amt>'
+        f'<CdtDbtInd>{"DBIT" if opening < 0 else "CRDT"}</CdtDbtInd><Dt><Dt>{dates.iloc[0]}</Dt></Dt></Bal>',
+    ]
+    for date, details, description, reference, amount in zip(
+        dates, rows['التفاصيل'], rows['الوصف'], rows['المرجع'], amounts
+    ):
+        parts.append(
+            f'<Ntry><Amt Ccy="SAR">{abs(amount):.2f}</Amt><CdtDbtInd>{"DBIT" if amount < 0 else "CRDT"}</CdtDbtInd>'
+            f'<BookgDt><Dt>{date}</Dt></BookgDt><AcctSvcrRef>{int(reference)}</AcctSvcrRef>'
+            f'<AddtlNtryInf>{escape(details)}</AddtlNtryInf>'
+            f'<NtryDtls><TxDtls><RmtInf><Ustrd>{escape(description)}</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>'
+        )
+    parts.append('</Stmt></BkToCstmrStmt></Document>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+# صيغ الملفات التي يُقاس عليها مسار القراءة الفعلي (parse_statement): (اسم الملف، دالة الكتابة)
+STATEMENT_FORMATS = {
+    'xlsx': ('statement.xlsx', write_xlsx),
+    'csv': ('statement.csv', write_csv),
+    'mt940': ('statement.sta', write_mt940),
+    'camt053': ('statement.xml', write_camt053),
+}
+
+
+def parse_size(label):
+    """تحويل حجم مثل 100k أو 1m إلى عدد صفوف"""
+    label = label.lower()
+    if label in SIZES:
+        return SIZES[label]
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    if label[-1] in multipliers:
+        return int(float(label[:-1]) * multipliers[label[-1]])
+    return int(label)
+
+
+def _measure(func, memory):
+    """تنفيذ دالة وقياس زمنها وذروة الذاكرة المخصصة أثناءها"""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    peak_mb = None
+    if memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def run_pipeline(statement, source=None, memory=True):
+    """تشغيل جميع مراحل المعالجة على كشف واحد وإرجاع قياس كل مرحلة
+
+    source: (محتوى الملف، اسمه) لقياس القراءة عبر parse_statement كما في التطبيق،
+    وإلا يبدأ القياس من الجدول مباشرة.
+    """
+    import forecasting
+    from accounting_engine import ProfessionalAccountingSystem
+    from statement_parsers import parse_statement
+
+    # كل قياس يبدأ بذاكرة توقعات فارغة حتى لا يُقاس نموذج محفوظ من صيغة سابقة
+    forecasting._model_cache.clear()
+
+    results = {}
+
+    def record(stage, func):
+        result, seconds, peak_mb = _measure(func, memory)
+        results[stage] = {'seconds': seconds, 'peak_mb': peak_mb}
+        return result
+
+    if source is not None:
+        content, file_name = source
+
+        statement = record('read_statement', lambda: parse_statement(io.BytesIO(content), file_name, learn=False)[0])
+
+    accounting_system = record('clean_data', lambda: ProfessionalAccountingSystem(statement))
+    record('classify_transactions', accounting_system.classify_transactions)
+    for stage in PIPELINE_STAGES[3:]:
+        record(stage, getattr(accounting_system, stage))
+    return results
+
+
+def compare_with_baseline(size_label, results, baselines, tolerance):
+    """مقارنة القياسات بخط الأساس وإرجاع المراحل التي تراجع أداؤها"""
+    baseline = baselines.get(size_label, {})
+    regressions = []
+    for stage, measured in results.items():
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if measured[metric] is None or reference.get(metric) is None:
+                continue
+            # تجاهل الفروق الصغيرة جداً التي تقع ضمن ضجيج القياس
+            floor = 0.005 if metric == 'seconds' else 0.5
+            if measured[metric] > max(reference[metric], floor) * (1 + tolerance):
+                regressions.append((stage, metric, reference[metric], measured[metric]))
+    return regressions
+
+
+def _format(value, unit):
+    return '-' if value is None else f"{value:,.3f} {unit}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مراحل النظام المحاسبي على كشوف صناعية")
+    parser.add_argument('--sizes', nargs='+', default=['1k', '100k'], help="أحجام الكشوف: 1k 100k 1m 10m أو عدد صفوف")
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], choices=list(STATEMENT_FORMATS),
+                        help="صيغ الملفات التي يُقاس عليها زمن القراءة الفعلي")
+    parser.add_argument('--excel-max-rows', type=int, default=100_000, help="أكبر حجم يُقاس له زمن قراءة ملفات xlsx")
+    parser.add_argument('--no-memory', action='store_true', help="عدم قياس ذروة الذاكرة (أسرع)")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="ملف خط الأساس")
+    parser.add_argument('--save-baseline', action='store_true', help="حفظ النتائج كخط أساس جديد")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="نسبة التراجع المسموح بها قبل اعتباره تراجعاً")
+    parser.add_argument('--write-sample', metavar='PATH', help="حفظ كشف صناعي بحجم أول قيمة في --sizes كملف Excel والخروج")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.write_sample:
+        generate_statement(parse_size(args.sizes[0]), seed=args.seed).to_excel(args.write_sample, index=False)
+        print(f"تم حفظ {args.write_sample}")
+        return 0
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    all_results = {}
+    regressions = []
+    for size_label in args.sizes:
+        rows = parse_size(size_label)
+        statement = generate_statement(rows, seed=args.seed)
+
+        for fmt in args.formats:
+            file_name, writer = STATEMENT_FORMATS[fmt]
+            # كتابة xlsx للكشوف الضخمة بطيئة جداً، فيبدأ القياس عندها من الجدول مباشرة
+            source = None
+            if fmt != 'xlsx' or rows <= args.excel_max_rows:
+                source = (writer(statement), file_name)
+
+            results = run_pipeline(statement, source, memory=not args.no_memory)
+            label = f"{size_label}:{fmt}"
+            all_results[label] = results
+
+            print(f"\n=== {size_label} ({rows:,} حركة، {fmt}) ===")
+            for stage, measured in results.items():
+                print(f"{stage:<32}{_format(measured['seconds'], 's'):>16}{_format(measured['peak_mb'], 'MB'):>18}")
+
+            label_regressions = compare_with_baseline(label, results, baselines, args.tolerance)
+            for stage, metric, reference, measured in label_regressions:
+                print(f"⚠️ تراجع في {stage} ({metric}): {reference:,.3f} ← {measured:,.3f}")
+            regressions.extend(label_regressions)
+
+    if args.save_baseline:
+        baselines.update(all_results)
+        baselines['_environment'] = {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"\nتم حفظ خط الأساس في {args.baseline}")
+
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# أنواع الحركات التي تتبع حوالة سابقة ولا تُعد مصروفاً مستقلاً
+FEE_DETAILS = 'رسوم تحويل'
+VAT_DETAILS = 'ضريبة القيمة المضافة'
+LINKED_DETAILS = (FEE_DETAILS, VAT_DETAILS)
+
+# عدد الحركات السابقة (بالترتيب الزمني) التي يُبحث فيها عن الحوالة الأم
+LOOKBACK_ROWS = 8
+
+PARENT_COLUMN = 'المعاملة الأم'
+
+
+def chronological_order(df):
+    """ترتيب الصفوف زمنياً على (التاريخ، التسلسل)
+
+    كشوف Excel تعرض أحدث الحركات أولاً، فيُعكس التسلسل داخل اليوم الواحد
+    حتى تسبق الحوالة رسومها وضريبتها.
+    """
+    dates = df['[SA]Processing Date']
+    valid = dates.dropna()
+    newest_first = len(valid) > 1 and valid.iloc[0] > valid.iloc[-1]
+
+    positions = np.arange(len(df))
+    sequence = positions[::-1] if newest_first else positions
+    day = dates.values.astype('datetime64[D]').astype('int64')
+    return np.lexsort((sequence, day))
+
+
+def link_fees(df, lookback=LOOKBACK_ROWS):
+    """ربط كل سطر رسوم أو ضريبة بالحوالة التي سبقته
+
+    مرور واحد بالترتيب الزمني مع نافذة محدودة من آخر الحوالات المدينة:
+    تُفضل الحوالة التي تحمل نفس المرجع، وإلا فأحدث حوالة في نفس اليوم.
+    يعيد عمود بتسمية صف الحوالة الأم (أو قيمة فارغة إن لم توجد).
+    """
+    order = chronological_order(df)
+    details = df['التفاصيل'].to_numpy(dtype=object)
+    debits = df['مدين'].to_numpy(dtype='float64')
+    days = df['[SA]Processing Date'].values.astype('datetime64[D]')
+    if 'المرجع' in df.columns:
+        references = df['المرجع'].to_numpy(dtype=object)
+    else:
+        references = np.full(len(df), None, dtype=object)
+
+    parents = np.full(len(df), -1, dtype='int64')
+    window = deque(maxlen=lookback)
+
+    for position in order:
+        if details[position] in LINKED_DETAILS:
+            reference = references[position]
+            same_day = None
+            for candidate in reversed(window):
+                if reference is not None and reference == reference and references[candidate] == reference:
+                    parents[position] = candidate
+                    break
+                if same_day is None and days[candidate] == days[position]:
+                    same_day = candidate
+            else:
+                if same_day is not None:
+                    parents[position] = same_day
+        elif debits[position] != 0:
+            window.append(position)
+
+    linked = parents >= 0
+    result = pd.Series(pd.NA, index=df.index, dtype='Int64', name=PARENT_COLUMN)
+    result[linked] = df.index.to_numpy()[parents[linked]]
+    return result
+
+
+def transfer_costs(df):
+    """التكلفة الفعلية لكل حوالة: المبلغ + الرسوم + ضريبة القيمة المضافة"""
+    linked = df[df[PARENT_COLUMN].notna()]
+    if linked.empty:
+        return pd.DataFrame(columns=['التاريخ', 'التفاصيل', 'المرجع', 'مبلغ الحوالة', 'الرسوم',
+                                     'ضريبة القيمة المضافة', 'التكلفة الفعلية', 'نسبة التكلفة %'])
+
+    charges = linked.assign(المبلغ=linked['مدين'].abs()).pivot_table(
+        index=PARENT_COLUMN, columns='التفاصيل', values='المبلغ', aggfunc='sum', fill_value=0
+    ).reindex(columns=list(LINKED_DETAILS), fill_value=0)
+
+    parents = df.loc[charges.index.to_numpy(dtype='int64')]
+    amounts = parents['مدين'].abs().to_numpy()
+    fees = charges[FEE_DETAILS].to_numpy()
+    vat = charges[VAT_DETAILS].to_numpy()
+
+    report = pd.DataFrame({
+        'التاريخ': parents['[SA]Processing Date'].to_numpy(),
+        'التفاصيل': parents['التفاصيل'].to_numpy(),
+        'المرجع': parents['المرجع'].to_numpy() if 'المرجع' in parents.columns else None,
+        'مبلغ الحوالة': amounts,
+        'الرسوم': fees,
+        'ضريبة القيمة المضافة': vat,
+        'التكلفة الفعلية': amounts + fees + vat,
+    }, index=parents.index)
+    # المبالغ أعداد صحيحة بالهللة، ويُقرب عمود النسبة فقط
+    report['نسبة التكلفة %'] = np.round(np.where(amounts > 0, (fees + vat) / np.where(amounts > 0, amounts, 1) * 100, 0), 2)
+    return report.sort_values('التاريخ')
+
+
+def vat_summary(df):
+    """ملخص ضريبة القيمة المضافة والرسوم البنكية لكل شهر"""
+    charges = df[df['التفاصيل'].isin(LINKED_DETAILS)]
+    if charges.empty:
+        return pd.DataFrame(columns=['السنة', 'الشهر', 'إجمالي الرسوم', 'إجمالي الضريبة', 'عدد حركات الضريبة',
+                                     'حركات غير مرتبطة', 'نسبة الضريبة الفعلية %'])
+
+    amounts = charges['مدين'].abs()
+    is_vat = charges['التفاصيل'] == VAT_DETAILS
+    summary = pd.DataFrame({
+        'السنة': charges['السنة'],
+        'الشهر': charges['الشهر'],
+        'إجمالي الرسوم': amounts.where(~is_vat, 0),
+        'إجمالي الضريبة': amounts.where(is_vat, 0),
+        'عدد حركات الضريبة': is_vat.astype('int64'),
+        'حركات غير مرتبطة': charges[PARENT_COLUMN].isna().astype('int64'),
+    }).groupby(['السنة', 'الشهر']).sum().reset_index()
+    fees = summary['إجمالي الرسوم']
+    summary['نسبة الضريبة الفعلية %'] = np.round(
+        np.where(fees > 0, summary['إجمالي الضريبة'] / fees.where(fees > 0, 1) * 100, 0), 2)
+    return summary
@@ -0,0 +1,149 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from fee_linkage import chronological_order
+
+# طول الموسم بالأشهر لنموذج التكرار الموسمي
+SEASON_LENGTH = 12
+
+# قيم معامل التنعيم التي تُجرب لكل حساب في التنعيم الأسي البسيط
+SMOOTHING_ALPHAS = np.linspace(0.05, 0.95, 19)
+
+FORECAST_METHODS = ['auto', 'seasonal_naive', 'exponential_smoothing']
+
+# عدد النماذج المحفوظة (كشف × طريقة) قبل حذف الأقدم
+MODEL_CACHE_SIZE = 32
+
+_model_cache = OrderedDict()
+# جلسات Streamlit تعمل في خيوط متوازية وتشترك في نفس الذاكرة المؤقتة
+_model_cache_lock = threading.Lock()
+
+
+def statement_hash(df):
+    """بصمة محتوى الكشف لاستخدامها كمفتاح للنماذج المحفوظة
+
+    تشمل التواريخ والمبالغ والحساب المحاسبي الذي يُجمع عليه المكعب الشهري، وترتيب الصفوف
+    (الرصيد الأخير يعتمد عليه). الحساب يُبصم كرموز فئوية (أعداد صحيحة) مع قائمة الفئات،
+    وهو أسرع بكثير من بصم النصوص صفاً صفاً.
+    """
+    columns = ['[SA]Processing Date', 'مدين', 'دائن', 'الرصيد']
+    frame = df[columns].copy()
+    accounts = pd.Categorical(df['الحساب المحاسبي'])
+    frame['الحساب المحاسبي'] = accounts.codes
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    digest.update('\x1f'.join(map(str, accounts.categories)).encode('utf-8'))
+    return f"{len(df)}-{digest.hexdigest()}"
+
+
+def monthly_cube(df):
+    """صافي التدفق لكل شهر ولكل حساب محاسبي (الأشهر بلا حركة تساوي صفراً)
+
+    المدين مخزن بقيمة سالبة في كشوف البنك، لذا يُطرح بقيمته المطلقة
+    حتى يطابق صافي التدفق تغير الرصيد.
+    """
+    dates = df['[SA]Processing Date']
+    valid = dates.notna()
+    periods = dates[valid].dt.to_period('M')
+    net_flow = (df['دائن'] - df['مدين'].abs())[valid]
+    accounts = df.loc[valid, 'الحساب المحاسبي']
+
+    cube = net_flow.groupby([periods, accounts]).sum().unstack(fill_value=0)
+    full_range = pd.period_range(cube.index.min(), cube.index.max(), freq='M')
+    return cube.reindex(full_range, fill_value=0)
+
+
+def _fit_exponential_smoothing(values):
+    """تنعيم أسي بسيط لجميع الحسابات دفعة واحدة مع اختيار أفضل معامل لكل حساب
+
+    values مصفوفة (الأشهر × الحسابات)، وتُجرب جميع المعاملات معاً في كل خطوة زمنية.
+    """
+    months, accounts = values.shape
+    alphas = SMOOTHING_ALPHAS[:, None]
+    level = np.repeat(values[:1], len(SMOOTHING_ALPHAS), axis=0)
+    squared_error = np.zeros((len(SMOOTHING_ALPHAS), accounts))
+    for t in range(1, months):
+        error = values[t] - level
+        squared_error += error ** 2
+        level += alphas * error
+
+    best = squared_error.argmin(axis=0)
+    columns = np.arange(accounts)
+    mse = squared_error[best, columns] / max(months - 1, 1)
+    return SMOOTHING_ALPHAS[best], level[best, columns], mse
+
+
+def _fit_seasonal_naive(values):
+    """التكرار الموسمي: قيمة الشهر نفسه من السنة السابقة"""
+    months, accounts = values.shape
+    if months <= SEASON_LENGTH:
+        return None, np.full(accounts, np.inf)
+    errors = values[SEASON_LENGTH:] - values[:-SEASON_LENGTH]
+    return values[-SEASON_LENGTH:].copy(), (errors ** 2).mean(axis=0)
+
+
+def _last_balance(df):
+    """الرصيد بعد آخر حركة زمنياً (بالهللة)"""
+    return int(df['الرصيد'].to_numpy()[chronological_order(df)[-1]])
+
+
+def fit_forecast_model(df, method='auto'):
+    """ملاءمة نماذج التوقع على المكعب الشهري (مع حفظها حسب بصمة الكشف)"""
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"طريقة توقع غير مدعومة: {method}")
+
+    key = (statement_hash(df), method)
+    with _model_cache_lock:
+        if key in _model_cache:
+            _model_cache.move_to_end(key)
+            return _model_cache[key]
+
+    cube = monthly_cube(df)
+    values = cube.to_numpy(dtype='float64')
+    alpha, level, smoothing_mse = _fit_exponential_smoothing(values)
+    season, seasonal_mse = _fit_seasonal_naive(values)
+
+    if method == 'seasonal_naive' and season is not None:
+        use_seasonal = np.ones(values.shape[1], dtype=bool)
+    elif method == 'auto':
+        use_seasonal = seasonal_mse < smoothing_mse
+    else:
+        use_seasonal = np.zeros(values.shape[1], dtype=bool)
+
+    model = {
+        'accounts': list(cube.columns),
+        'last_period': cube.index[-1],
+        'history': cube,
+        'use_seasonal': use_seasonal,
+        'alpha': alpha,
+        'level': level,
+        'season': season,
+        'last_balance': _last_balance(df),
+    }
+
+    # الملاءمة خارج القفل: جلستان على نفس الكشف قد تلائمان نفس النموذج مرتين بنفس النتيجة
+    with _model_cache_lock:
+        _model_cache[key] = model
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+    return model
+
+
+def forecast(model, months=3):
+    """توقع صافي التدفق لكل حساب والرصيد في نهاية كل شهر من الأشهر القادمة (بالهللة)"""
+    steps = np.arange(months)
+    projected = np.repeat(model['level'][None, :], months, axis=0)
+    if model['season'] is not None and model['use_seasonal'].any():
+        seasonal = model['season'][steps % SEASON_LENGTH]
+        projected = np.where(model['use_seasonal'][None, :], seasonal, projected)
+
+    periods = pd.period_range(model['last_period'] + 1, periods=months, freq='M')
+    # التوقع يُقرب لأقرب هللة لكل حساب، ثم تُجمع القيم الصحيحة
+    result = pd.DataFrame(np.rint(projected).astype('int64'), index=periods, columns=model['accounts'])
+    result['صافي التدفق'] = result.sum(axis=1)
+    result['الرصيد المتوقع'] = model['last_balance'] + result['صافي التدفق'].cumsum()
+    result.index.name = 'الفترة'
+    return result
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+# المبالغ تُخزن داخلياً كأعداد صحيحة بالهللة (int64) حتى تكون المجاميع دقيقة تماماً،
+# ولا تُحول إلى Decimal بالريال إلا عند العرض أو التصدير
+HALALAS_PER_RIYAL = 100
+CURRENCY_DECIMALS = 2
+
+# أعمدة المبالغ في الكشف والتقارير (قيمها بالهللة)
+MONEY_COLUMNS = frozenset([
+    'مدين', 'دائن', 'الرصيد',
+    'المبلغ المدين', 'المبلغ الدائن',
+    'مجموع المدين', 'مجموع الدائن',
+    'إجمالي المصروفات', 'إجمالي الإيرادات', 'متوسط المبلغ', 'أعلى مبلغ',
+    'صافي التدفق', 'الرصيد المتوقع', 'المبلغ',
+    'مبلغ الحوالة', 'الرسوم', 'ضريبة القيمة المضافة', 'التكلفة الفعلية',
+    'إجمالي الرسوم', 'إجمالي الضريبة',
+])
+
+
+def to_halalas(values):
+    """تحويل عمود مبالغ بالريال (أرقام أو نصوص) إلى int64 بالهللة
+
+    التقريب لأقرب هللة مرة واحدة عند القراءة دقيق لأي مبلغ بخانتين عشريتين
+    أصغر من 2^53 هللة، وبعدها تكون جميع العمليات على أعداد صحيحة.
+    """
+    riyals = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype='float64')
+    halalas = np.rint(riyals * HALALAS_PER_RIYAL).astype('int64')
+    return pd.Series(halalas, index=getattr(values, 'index', None), name=getattr(values, 'name', None))
+
+
+def round_divide(numerator, denominator):
+    """قسمة صحيحة مع التقريب لأقرب هللة (النصف لأعلى) دون المرور بالأعداد العشرية"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def to_decimal(halalas):
+    """قيمة بالهللة إلى Decimal بالريال (بخانتين عشريتين)"""
+    if halalas is None or halalas is pd.NA or (isinstance(halalas, float) and halalas != halalas):
+        return None
+    return Decimal(int(halalas)).scaleb(-CURRENCY_DECIMALS)
+
+
+def format_amount(halalas):
+    """تنسيق مبلغ بالهللة للعرض: 1,234.56"""
+    return f"{to_decimal(halalas):,.2f}"
+
+
+def to_riyals(values):
+    """مبالغ بالهللة إلى ريال كأعداد عشرية (للرسوم البيانية فقط)"""
+    return values / HALALAS_PER_RIYAL
+
+
+def decimal_statement(statement):
+    """تحويل قائمة مالية (قاموس متداخل بالهللة) إلى Decimal بالريال"""
+    return {
+        key: decimal_statement(value) if isinstance(value, dict) else to_decimal(value)
+        for key, value in statement.items()
+    }
+
+
+def decimal_frame(df, columns=None):
+    """نسخة من الجدول بأعمدة المبالغ محولة إلى Decimal بالريال (للعرض والتصدير)
+
+    columns: أعمدة المبالغ، وافتراضياً الأعمدة المعروفة في MONEY_COLUMNS.
+    """
+    if columns is None:
+        columns = [column for column in df.columns if column in MONEY_COLUMNS]
+    result = df.copy()
+    for column in columns:
+        result[column] = pd.Series([to_decimal(value) for value in df[column].tolist()],
+                                   index=df.index, dtype='object')
+    return result
@@ -0,0 +1,239 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+from money import format_amount
+
+# مسارات الخطوط العربية التي يُبحث عنها إذا لم يُحدد المتغير ARABIC_FONT_PATH
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/noto/NotoNaskhArabic-Regular.ttf',
+    '/usr/share/fonts/truetype/amiri/amiri-regular.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+]
+FONT_NAME = 'ArabicReport'
+
+# قوالب القوائم المالية: العنوان وعناوين الأعمدة وترتيب الأقسام
+STATEMENT_TEMPLATES = {
+    'income_statement': {
+        'title': 'قائمة الدخل',
+        'columns': ('البند', 'المبلغ (ريال)'),
+    },
+    'balance_sheet': {
+        'title': 'الميزانية العمومية',
+        'columns': ('البند', 'المبلغ (ريال)'),
+    },
+    'cash_flow': {
+        'title': 'قائمة التدفقات النقدية',
+        'columns': ('البند', 'المبلغ (ريال)'),
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """تسجيل الخط العربي مرة واحدة لكل عملية"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_path = os.environ.get('ARABIC_FONT_PATH')
+    if not font_path:
+        font_path = next((path for path in FONT_CANDIDATES if os.path.exists(path)), None)
+    if not font_path:
+        raise FileNotFoundError("لم يتم العثور على خط عربي، حدد المسار عبر المتغير ARABIC_FONT_PATH")
+
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+    return FONT_NAME
+
+
+@lru_cache(maxsize=None)
+def _reshaper():
+    import arabic_reshaper
+    return arabic_reshaper.ArabicReshaper()
+
+
+@lru_cache(maxsize=8192)
+def shape_text(text):
+    """تشكيل النص العربي وترتيبه للعرض من اليمين لليسار (مع تخزين النتيجة)"""
+    from bidi.algorithm import get_display
+    return get_display(_reshaper().reshape(text))
+
+
+@lru_cache(maxsize=None)
+def compile_template(kind):
+    """تجهيز القالب مسبقاً: تشكيل النصوص الثابتة وحساب مواضع الأعمدة"""
+    from reportlab.lib.pagesizes import A4
+
+    template = STATEMENT_TEMPLATES[kind]
+    width, height = A4
+    margin = 50
+    return {
+        'kind': kind,
+        'page_size': A4,
+        'title': shape_text(template['title']),
+        'columns': tuple(shape_text(column) for column in template['columns']),
+        'label_x': width - margin,
+        'amount_x': margin,
+        'top_y': height - margin,
+        'bottom_y': margin,
+        'line_height': 20,
+    }
+
+
+def _statement_lines(statement):
+    """تحويل القائمة المالية (قاموس متداخل) إلى أسطر: (النوع، البند، المبلغ)"""
+    for section, items in statement.items():
+        if isinstance(items, dict):
+            yield 'section', section, None
+            for item, value in items.items():
+                yield 'item', item, value
+        else:
+            yield 'total', section, items
+
+
+def render_statement_pdf(kind, statement, subtitle=None):
+    """إنشاء ملف PDF لقائمة مالية (مبالغها بالهللة) وإرجاع محتواه"""
+    from reportlab.pdfgen import canvas
+
+    font = register_font()
+    template = compile_template(kind)
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=template['page_size'])
+    pdf.setTitle(STATEMENT_TEMPLATES[kind]['title'])
+
+    def start_page():
+        y = template['top_y']
+        pdf.setFont(font, 16)
+        pdf.drawRightString(template['label_x'], y, template['title'])
+        y -= template['line_height']
+        if subtitle:
+            pdf.setFont(font, 10)
+            pdf.drawRightString(template['label_x'], y, shape_text(subtitle))
+            y -= template['line_height']
+        pdf.setFont(font, 11)
+        pdf.drawRightString(template['label_x'], y, template['columns'][0])
+        pdf.drawString(template['amount_x'], y, template['columns'][1])
+        y -= 6
+        pdf.line(template['amount_x'], y, template['label_x'], y)
+        return y - template['line_height']
+
+    y = start_page()
+    for line_type, label, value in _statement_lines(statement):
+        if y < template['bottom_y']:
+            pdf.showPage()
+            y = start_page()
+
+        if line_type == 'section':
+            pdf.setFont(font, 12)
+            pdf.drawRightString(template['label_x'], y, shape_text(str(label)))
+        else:
+            pdf.setFont(font, 12 if line_type == 'total' else 10)
+            indent = 0 if line_type == 'total' else 15
+            pdf.drawRightString(template['label_x'] - indent, y, shape_text(str(label)))
+            pdf.drawString(template['amount_x'], y, format_amount(value))
+        y -= template['line_height']
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def statements_of(accounting_system):
+    """استخراج القوائم المالية الثلاث من النظام المحاسبي"""
+    if 'الحساب المحاسبي' not in accounting_system.df.columns:
+        accounting_system.classify_transactions()
+    return [
+        ('income_statement', accounting_system.generate_income_statement()),
+        ('balance_sheet', accounting_system.generate_balance_sheet()),
+        ('cash_flow', accounting_system.generate_cash_flow_statement()),
+    ]
+
+
+def _warm_worker():
+    """تهيئة عملية العامل: تسجيل الخط وتجهيز القوالب قبل استلام المهام"""
+    register_font()
+    for kind in STATEMENT_TEMPLATES:
+        compile_template(kind)
+
+
+def _render_job(name, kind, statement, output_dir, subtitle):
+    """تنفيذ مهمة واحدة داخل العامل مع قياس زمن الإنشاء"""
+    started = time.perf_counter()
+    content = render_statement_pdf(kind, statement, subtitle)
+    render_seconds = time.perf_counter() - started
+
+    path = os.path.join(output_dir, f'{name}.pdf')
+    with open(path, 'wb') as f:
+        f.write(content)
+
+    return {
+        'name': name,
+        'kind': kind,
+        'path': path,
+        'bytes': len(content),
+        'render_seconds': render_seconds,
+        'pid': os.getpid(),
+    }
+
+
+def render_batch(jobs, output_dir, max_workers=None, subtitle=None):
+    """إنشاء دفعة من ملفات PDF باستخدام مجموعة عمليات
+
+    jobs: قائمة من (الاسم، نوع القائمة، القائمة المالية)
+    يعيد سجلاً لكل مستند يتضمن زمن الإنشاء بالثواني.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_worker) as executor:
+        futures = [
+            executor.submit(_render_job, name, kind, statement, output_dir, subtitle)
+            for name, kind, statement in jobs
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return sorted(results, key=lambda record: record['name'])
+
+
+def summarize_timings(results):
+    """ملخص أزمنة الإنشاء لدفعة من المستندات"""
+    timings = sorted(record['render_seconds'] for record in results)
+    if not timings:
+        return {'documents': 0}
+    return {
+        'documents': len(timings),
+        'total_seconds': sum(timings),
+        'mean_seconds': sum(timings) / len(timings),
+        'p95_seconds': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max_seconds': timings[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="إنشاء القوائم المالية بصيغة PDF لمجموعة من كشوف الحساب")
+    parser.add_argument('files', nargs='+', help="ملفات كشوف الحساب البنكية")
+    parser.add_argument('--out', default='pdf_reports', help="مجلد الملفات الناتجة")
+    parser.add_argument('--workers', type=int, default=None, help="عدد العمليات")
+    args = parser.parse_args()
+
+    from accounting_engine import ProfessionalAccountingSystem
+
+    jobs = []
+    for path in args.files:
+        accounting_system = ProfessionalAccountingSystem(path)
+        base_name = os.path.splitext(os.path.basename(path))[0]
+        for kind, statement in statements_of(accounting_system):
+            jobs.append((f'{base_name}_{kind}', kind, statement))
+
+    results = render_batch(jobs, args.out, max_workers=args.workers)
+    for record in results:
+        print(f"{record['name']}: {record['render_seconds'] * 1000:.1f} ms ({record['bytes']:,} bytes)")
+    summary = summarize_timings(results)
+    print(f"المستندات: {summary['documents']} | المتوسط: {summary['mean_seconds'] * 1000:.1f} ms | p95: {summary['p95_seconds'] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
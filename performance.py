@@ -0,0 +1,189 @@
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+# مسار سجل الأداء (JSON سطر لكل مرحلة)، ويُعطل إذا كانت قيمة المتغير فارغة
+PERF_LOG_PATH = os.environ.get('SMART_ACCOUNTING_PERF_LOG', 'performance_log.jsonl')
+
+# الواجهة لا تكتب السجل إلا مع ?perf=1 أو عند ضبط المتغير صراحة
+PERF_LOG_ENABLED = 'SMART_ACCOUNTING_PERF_LOG' in os.environ
+
+# تدوير السجل حتى لا يكبر بلا حد: 5 ميغابايت لكل ملف مع 3 نسخ قديمة
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+PERF_LOG_BACKUPS = 3
+
+# عدد الدوال التي تُحفظ من نتائج cProfile لكل مرحلة
+PROFILE_TOP_FUNCTIONS = 15
+
+_logger = logging.getLogger('smart_accounting.performance')
+
+
+def _json_logger(log_path):
+    """إعداد مسجل يكتب كل سجل كسطر JSON مستقل (مرة واحدة لكل مسار)"""
+    logger = logging.getLogger(f'smart_accounting.performance.{log_path}')
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=PERF_LOG_MAX_BYTES, backupCount=PERF_LOG_BACKUPS, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class PerformanceRecorder:
+    """قياس زمن وذاكرة كل مرحلة من مراحل المعالجة وتسجيلها"""
+
+    def __init__(self, session_id=None, profile=False, trace_memory=False, log_path=PERF_LOG_PATH):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.log_path = log_path
+        self.records = []
+        self._stack = []
+        self._profiler = None
+        self._owns_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name, **context):
+        """سياق يقيس زمن المرحلة (وذاكرتها وملفها التعريفي عند التفعيل)"""
+        parent = self._stack[-1] if self._stack else None
+        frame = {'name': name, 'peak': 0}
+        self._stack.append(frame)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        # مُحلل واحد فقط في كل مرة: يُفعل على المرحلة الخارجية فقط
+        profiler = None
+        if self.profile and self._profiler is None:
+            profiler = cProfile.Profile()
+            self._profiler = profiler
+            profiler.enable()
+
+        status = 'ok'
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self._stack.pop()
+
+            record = {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'session_id': self.session_id,
+                'stage': name,
+                'parent': parent['name'] if parent else None,
+                'seconds': round(seconds, 6),
+                'status': status,
+            }
+            record.update(context)
+
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_mb'] = round(peak / (1024 * 1024), 3)
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], peak)
+                elif self._owns_tracemalloc:
+                    tracemalloc.stop()
+                    self._owns_tracemalloc = False
+
+            if profiler is not None:
+                profiler.disable()
+                self._profiler = None
+                record['profile'] = _profile_summary(profiler)
+
+            self.records.append(record)
+            self._write(record)
+
+    def _write(self, record):
+        if not self.log_path:
+            return
+        try:
+            _json_logger(self.log_path).info(json.dumps(record, ensure_ascii=False, default=str))
+        except OSError as e:
+            _logger.warning("تعذر كتابة سجل الأداء: %s", e)
+
+    def summary(self):
+        """جدول مختصر بسجلات الجلسة الحالية"""
+        import pandas as pd
+
+        columns = ['stage', 'parent', 'seconds', 'peak_mb', 'rows', 'status']
+        return pd.DataFrame(self.records).reindex(columns=columns)
+
+
+def _profile_summary(profiler):
+    """أهم الدوال من نتائج cProfile مرتبة بالزمن التراكمي"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+def timed_stage(func):
+    """مُزخرف لدوال النظام المحاسبي: يقيس الدالة كمرحلة باسمها"""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        recorder = getattr(self, 'performance', None)
+        if recorder is None:
+            return func(self, *args, **kwargs)
+        rows = len(self.df) if getattr(self, 'df', None) is not None else None
+        with recorder.stage(func.__name__, rows=rows):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def load_performance_log(log_path=PERF_LOG_PATH):
+    """قراءة سجل الأداء كجدول (مع النسخ المدورة، الأقدم أولاً)"""
+    import pandas as pd
+
+    paths = [f'{log_path}.{index}' for index in range(PERF_LOG_BACKUPS, 0, -1)] + [log_path]
+    records = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    return pd.DataFrame(records)
+
+
+def aggregate_performance_log(log_path=PERF_LOG_PATH):
+    """تجميع أزمنة المراحل عبر جميع الجلسات المسجلة"""
+    frame = load_performance_log(log_path)
+    if frame.empty:
+        return frame
+    summary = frame.groupby('stage')['seconds'].agg(
+        runs='count',
+        mean='mean',
+        p95=lambda seconds: seconds.quantile(0.95),
+        max='max',
+    )
+    summary['sessions'] = frame.groupby('stage')['session_id'].nunique()
+    return summary.sort_values('mean', ascending=False)
+
+
+if __name__ == '__main__':
+    print(aggregate_performance_log(sys.argv[1] if len(sys.argv) > 1 else PERF_LOG_PATH).to_string())
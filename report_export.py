@@ -0,0 +1,183 @@
+import csv
+import io
+import zipfile
+
+import pandas as pd
+
+from money import decimal_frame, to_decimal
+
+# صيغ التصدير المتاحة: (اسم الملف، نوع MIME)
+EXPORT_FORMATS = {
+    'xlsx': ('التقارير_المحاسبية.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('التقارير_المحاسبية_csv.zip', 'application/zip'),
+    'parquet': ('التقارير_المحاسبية_parquet.zip', 'application/zip'),
+}
+
+JOURNAL_COLUMNS = ['التاريخ', 'الحساب المدين', 'المبلغ المدين', 'الحساب الدائن', 'المبلغ الدائن', 'الوصف']
+JOURNAL_AMOUNT_COLUMNS = ('المبلغ المدين', 'المبلغ الدائن')
+
+# الحد الأقصى لعدد الصفوف في ورقة Excel واحدة (بما فيها صف العناوين)
+EXCEL_MAX_ROWS = 1048576
+
+# عدد قيود اليومية في كل دفعة عند الكتابة بصيغة Parquet
+PARQUET_BATCH_SIZE = 65536
+
+
+def statement_to_frame(statement):
+    """تحويل قائمة مالية (قاموس متداخل) إلى جدول"""
+    rows = []
+    for section, items in statement.items():
+        if isinstance(items, dict):
+            for item, value in items.items():
+                rows.append({'القسم': section, 'البند': item, 'المبلغ': value})
+        else:
+            rows.append({'القسم': section, 'البند': section, 'المبلغ': items})
+    return pd.DataFrame(rows, columns=['القسم', 'البند', 'المبلغ'])
+
+
+def collect_reports(accounting_system):
+    """تجهيز جميع التقارير (عدا قيود اليومية) كجداول مع أسماء أوراقها وملفاتها
+
+    المبالغ محسوبة بالهللة وتُحول هنا فقط إلى Decimal بالريال.
+    """
+    reports = [
+        ('ميزان المراجعة', 'trial_balance', accounting_system.generate_trial_balance()),
+        ('قائمة الدخل', 'income_statement', statement_to_frame(accounting_system.generate_income_statement())),
+        ('التدفقات النقدية', 'cash_flow', statement_to_frame(accounting_system.generate_cash_flow_statement())),
+        ('الميزانية العمومية', 'balance_sheet', statement_to_frame(accounting_system.generate_balance_sheet())),
+        ('تحليل المصروفات', 'expense_analysis', accounting_system.generate_expense_analysis().reset_index()),
+        ('تحليل الإيرادات', 'revenue_analysis', accounting_system.generate_revenue_analysis().reset_index()),
+        ('التقارير الشهرية', 'monthly_report', accounting_system.generate_monthly_reports()),
+        ('تكلفة الحوالات', 'transfer_costs', accounting_system.generate_transfer_costs()),
+        ('ملخص الضريبة', 'vat_summary', accounting_system.generate_vat_report()),
+    ]
+    return [(sheet_name, file_name, decimal_frame(report)) for sheet_name, file_name, report in reports]
+
+
+def _cell(value):
+    """تحويل القيمة إلى نوع يقبله الكاتب (القيم المفقودة تصبح خلايا فارغة)"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, pd.Timestamp):
+        return value.item()
+    return value
+
+
+def _journal_rows(accounting_system):
+    """توليد صفوف قيود اليومية واحداً تلو الآخر دون بناء جدول كامل في الذاكرة"""
+    for entry in accounting_system.iter_journal_entries():
+        yield [to_decimal(entry[column]) if column in JOURNAL_AMOUNT_COLUMNS else _cell(entry[column])
+               for column in JOURNAL_COLUMNS]
+
+
+def _write_xlsx(accounting_system, target):
+    """كتابة مصنف متعدد الأوراق بوضع الذاكرة الثابتة"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(target, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'remove_timezone': True,
+    })
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#DDEBF7'})
+
+    def add_sheet(name, columns):
+        worksheet = workbook.add_worksheet(name)
+        worksheet.right_to_left()
+        worksheet.write_row(0, 0, columns, header_format)
+        return worksheet
+
+    # قيود اليومية: تُكتب صفاً صفاً وتُقسم على عدة أوراق إذا تجاوزت حد Excel
+    sheet_number = 1
+    worksheet = add_sheet('قيود اليومية', JOURNAL_COLUMNS)
+    row_index = 1
+    for row in _journal_rows(accounting_system):
+        if row_index == EXCEL_MAX_ROWS:
+            sheet_number += 1
+            worksheet = add_sheet(f'قيود اليومية ({sheet_number})', JOURNAL_COLUMNS)
+            row_index = 1
+        worksheet.write_row(row_index, 0, row)
+        row_index += 1
+
+    for sheet_name, _, report in collect_reports(accounting_system):
+        worksheet = add_sheet(sheet_name, [str(column) for column in report.columns])
+        for row_index, row in enumerate(report.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_index, 0, [_cell(value) for value in row])
+
+    workbook.close()
+
+
+def _write_csv(accounting_system, target):
+    """كتابة كل تقرير كملف CSV داخل أرشيف مضغوط"""
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('journal.csv', 'w') as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            writer = csv.writer(text)
+            writer.writerow(JOURNAL_COLUMNS)
+            writer.writerows(_journal_rows(accounting_system))
+            text.flush()
+            text.detach()
+
+        for _, file_name, report in collect_reports(accounting_system):
+            with archive.open(f'{file_name}.csv', 'w') as raw:
+                text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+                report.to_csv(text, index=False)
+                text.flush()
+                text.detach()
+
+
+def _write_parquet(accounting_system, target):
+    """كتابة كل تقرير كملف Parquet داخل أرشيف مضغوط (قيود اليومية على دفعات)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('التاريخ', pa.timestamp('ns')),
+        ('الحساب المدين', pa.string()),
+        ('المبلغ المدين', pa.decimal128(18, 2)),
+        ('الحساب الدائن', pa.string()),
+        ('المبلغ الدائن', pa.decimal128(18, 2)),
+        ('الوصف', pa.string()),
+    ])
+
+    def write_batch(writer, batch):
+        columns = list(zip(*batch))
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+    with zipfile.ZipFile(target, 'w') as archive:
+        with archive.open('journal.parquet', 'w') as raw:
+            writer = pq.ParquetWriter(raw, schema)
+            batch = []
+            for row in _journal_rows(accounting_system):
+                batch.append(row)
+                if len(batch) == PARQUET_BATCH_SIZE:
+                    write_batch(writer, batch)
+                    batch = []
+            if batch:
+                write_batch(writer, batch)
+            writer.close()
+
+        for _, file_name, report in collect_reports(accounting_system):
+            report = report.copy()
+            report.columns = [str(column) for column in report.columns]
+            with archive.open(f'{file_name}.parquet', 'w') as raw:
+                report.to_parquet(raw, index=False)
+
+
+def export_reports(accounting_system, target, export_format='xlsx'):
+    """تصدير قيود اليومية وجميع التقارير إلى ملف أو كائن ملف بالصيغة المطلوبة"""
+    writers = {
+        'xlsx': _write_xlsx,
+        'csv': _write_csv,
+        'parquet': _write_parquet,
+    }
+    if export_format not in writers:
+        raise ValueError(f"صيغة تصدير غير مدعومة: {export_format}")
+
+    if 'الحساب المحاسبي' not in accounting_system.df.columns:
+        accounting_system.classify_transactions()
+
+    writers[export_format](accounting_system, target)
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from difflib import SequenceMatcher
+
+# مسار ملف ملفات التعريف التي تم التعرف عليها تلقائياً
+PROFILES_PATH = os.environ.get(
+    'SMART_ACCOUNTING_PROFILES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bank_profiles.json')
+)
+
+# عدد الصفوف الأولى التي يُبحث فيها عن صف العناوين
+HEADER_SCAN_ROWS = 15
+
+# أقل درجة تشابه لقبول مطابقة عنوان عمود
+MIN_MATCH_SCORE = 0.6
+
+# الأعمدة الموحدة التي يعمل عليها النظام المحاسبي وأسماؤها البديلة المعروفة
+FIELD_SYNONYMS = {
+    '[SA]Processing Date': ['[SA]Processing Date', 'Processing Date', 'Transaction Date', 'Posting Date',
+                            'Value Date', 'Date', 'التاريخ', 'تاريخ العملية', 'تاريخ الحركة', 'تاريخ القيد'],
+    'التفاصيل': ['التفاصيل', 'نوع العملية', 'نوع الحركة', 'البيان', 'Details', 'Transaction Type', 'Narrative'],
+    'مدين': ['مدين', 'المبلغ المدين', 'سحب', 'المسحوبات', 'Debit', 'Debit Amount', 'Withdrawal', 'Withdrawals'],
+    'دائن': ['دائن', 'المبلغ الدائن', 'إيداع', 'الإيداعات', 'Credit', 'Credit Amount', 'Deposit', 'Deposits'],
+    'الرصيد': ['الرصيد', 'الرصيد المتاح', 'الرصيد بعد العملية', 'Balance', 'Running Balance', 'Available Balance'],
+    'الوصف': ['الوصف', 'وصف العملية', 'Description', 'Remarks'],
+    'المرجع': ['المرجع', 'رقم المرجع', 'Reference', 'Reference No', 'Ref'],
+}
+
+REQUIRED_FIELDS = ['[SA]Processing Date', 'التفاصيل', 'مدين', 'دائن', 'الرصيد']
+
+# ملفات تعريف مدمجة للبنوك التي تم التحقق من تنسيق كشوفها
+BUILTIN_PROFILES = {
+    'alahli': {
+        'bank': 'البنك الأهلي السعودي',
+        'headers': ['[SA]Processing Date', 'التفاصيل', 'الوصف', 'تفاصيل إضافية', 'المرجع', 'ملاحظات',
+                    'مدين', 'دائن', 'الرصيد'],
+        'header_row': 0,
+        'mapping': {
+            '[SA]Processing Date': '[SA]Processing Date',
+            'التفاصيل': 'التفاصيل',
+            'الوصف': 'الوصف',
+            'المرجع': 'المرجع',
+            'مدين': 'مدين',
+            'دائن': 'دائن',
+            'الرصيد': 'الرصيد',
+        },
+    },
+}
+
+_profiles = None
+
+# يحمي ملفات التعريف في الذاكرة وملف الحفظ من الكتابة المتزامنة (عمال خادم API)
+_profiles_lock = threading.RLock()
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaDetectionError(ValueError):
+    """تعذر التعرف على أعمدة كشف الحساب"""
+
+
+def normalize_header(header):
+    """توحيد كتابة عنوان العمود (المسافات، الهمزات، التاء المربوطة، التشكيل)"""
+    text = str(header).strip().lower()
+    text = re.sub(r'[ً-ْـ]', '', text)
+    text = re.sub('[أإآ]', 'ا', text).replace('ة', 'ه').replace('ى', 'ي')
+    return re.sub(r'\s+', ' ', text)
+
+
+def fingerprint(headers):
+    """بصمة صف العناوين: تتطابق لجميع الملفات التي لها نفس التنسيق"""
+    joined = '|'.join(normalize_header(header) for header in headers if not _is_blank(header))
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:16]
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, float) and value != value) or str(value).strip() == ''
+
+
+def load_profiles():
+    """تحميل ملفات التعريف (المدمجة والمحفوظة) مفهرسة ببصمة العناوين، مرة واحدة"""
+    global _profiles
+    with _profiles_lock:
+        if _profiles is None:
+            profiles = dict(BUILTIN_PROFILES)
+            profiles.update(_read_saved_profiles())
+            loaded = {}
+            for name, profile in profiles.items():
+                profile = dict(profile, name=name)
+                if profile.get('bank') == name:
+                    # ملفات محفوظة بإصدار سابق كانت تستخدم الاسم التلقائي كاسم للبنك
+                    profile['bank'] = None
+                loaded[fingerprint(profile['headers'])] = profile
+            _profiles = loaded
+        return _profiles
+
+
+def _read_saved_profiles():
+    if not os.path.exists(PROFILES_PATH):
+        return {}
+    try:
+        with open(PROFILES_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("تعذر قراءة ملفات التعريف %s: %s", PROFILES_PATH, e)
+        return {}
+
+
+def remember_profile(name, headers, mapping, header_row=0, bank=None):
+    """حفظ تنسيق جديد حتى لا يُعاد اكتشافه في المرات القادمة"""
+    profile = {
+        # التنسيقات المكتشفة تلقائياً بلا اسم بنك (لا يُعرض اسم الملف التعريفي كأنه بنك)
+        'bank': bank,
+        'headers': [str(header) for header in headers if not _is_blank(header)],
+        'header_row': header_row,
+        'mapping': mapping,
+    }
+    with _profiles_lock:
+        load_profiles()[fingerprint(headers)] = dict(profile, name=name)
+
+        saved = _read_saved_profiles()
+        saved[name] = profile
+        # الكتابة في ملف مؤقت ثم استبداله دفعة واحدة، حتى لا تقرأ عملية أخرى ملفاً نصف مكتوب
+        directory = os.path.dirname(os.path.abspath(PROFILES_PATH))
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.bank_profiles.', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, PROFILES_PATH)
+        except OSError as e:
+            logger.warning("تعذر حفظ ملف التعريف %s: %s", name, e)
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _score(header, synonym):
+    """درجة تشابه عنوان العمود مع اسم بديل (من 0 إلى 1)"""
+    header, synonym = normalize_header(header), normalize_header(synonym)
+    if header == synonym:
+        return 1.0
+    if len(synonym) >= 3 and (synonym in header or header in synonym):
+        return 0.75 + 0.25 * min(len(header), len(synonym)) / max(len(header), len(synonym))
+    return SequenceMatcher(None, header, synonym).ratio()
+
+
+def match_headers(headers):
+    """مطابقة العناوين تقريبياً مع الأعمدة الموحدة
+
+    يعيد (mapping من العنوان الأصلي إلى الاسم الموحد، درجة كل عمود موحد).
+    كل عنوان يُسند لعمود موحد واحد فقط، بدءاً من أعلى الدرجات.
+    """
+    candidates = []
+    for header in headers:
+        if _is_blank(header):
+            continue
+        for field, synonyms in FIELD_SYNONYMS.items():
+            score = max(_score(header, synonym) for synonym in synonyms)
+            if score >= MIN_MATCH_SCORE:
+                candidates.append((score, field in REQUIRED_FIELDS, header, field))
+
+    mapping, scores = {}, {}
+    for score, _, header, field in sorted(candidates, key=lambda c: (c[0], c[1]), reverse=True):
+        if header in mapping or field in scores:
+            continue
+        mapping[header] = field
+        scores[field] = round(score, 3)
+    return mapping, scores
+
+
+def _scan_header_rows(preview):
+    """البحث عن صف العناوين في أول صفوف الملف"""
+    profiles = load_profiles()
+    best = None
+    for row_index in range(len(preview)):
+        headers = list(preview.iloc[row_index])
+        profile = profiles.get(fingerprint(headers))
+        if profile:
+            return row_index, headers, profile, dict(profile['mapping']), {}
+
+        mapping, scores = match_headers(headers)
+        found = sum(field in scores for field in REQUIRED_FIELDS)
+        rank = (found, sum(scores.values()))
+        if best is None or rank > best[0]:
+            best = (rank, row_index, headers, mapping, scores)
+
+    if best is None:
+        raise SchemaDetectionError("الملف لا يحتوي على بيانات")
+    _, row_index, headers, mapping, scores = best
+    return row_index, headers, None, mapping, scores
+
+
+def detect_schema(source, reader):
+    """التعرف على تنسيق الملف: بصمة صف العناوين أولاً ثم المطابقة التقريبية"""
+    preview = reader(source, header=None, nrows=HEADER_SCAN_ROWS)
+    _rewind(source)
+
+    header_row, headers, profile, mapping, scores = _scan_header_rows(preview)
+    missing = [field for field in REQUIRED_FIELDS if field not in mapping.values()]
+    if missing:
+        raise SchemaDetectionError(
+            f"تعذر العثور على الأعمدة: {', '.join(missing)} | "
+            f"الأعمدة الموجودة: {', '.join(str(h) for h in headers if not _is_blank(h))}"
+        )
+
+    return {
+        'profile': profile['name'] if profile else None,
+        'bank': profile['bank'] if profile else None,
+        'fingerprint': fingerprint(headers),
+        'header_row': header_row,
+        'headers': headers,
+        'mapping': mapping,
+        'scores': scores,
+    }
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def read_statement(source, reader=None, learn=True):
+    """قراءة كشف الحساب بالأعمدة المطلوبة فقط وإعادة تسميتها بالأسماء الموحدة
+
+    التنسيقات المعروفة تُقرأ مباشرة عبر usecols، والتنسيقات الجديدة تُكتشف
+    بالمطابقة التقريبية ثم تُحفظ كملف تعريف (عند learn=True).
+    """
+    import pandas as pd
+
+    reader = reader or pd.read_excel
+    _rewind(source)
+
+    # محاولة سريعة: صف العناوين في أول الملف ومطابق لملف تعريف محفوظ
+    headers = list(reader(source, nrows=0).columns)
+    _rewind(source)
+    profile = load_profiles().get(fingerprint(headers))
+    if profile and profile.get('header_row', 0) == 0:
+        schema = {
+            'profile': profile['name'],
+            'bank': profile['bank'],
+            'fingerprint': fingerprint(headers),
+            'header_row': 0,
+            'headers': headers,
+            'mapping': dict(profile['mapping']),
+            'scores': {},
+        }
+    else:
+        schema = detect_schema(source, reader)
+        if learn and schema['profile'] is None:
+            name = f"auto_{schema['fingerprint']}"
+            remember_profile(name, schema['headers'], schema['mapping'], schema['header_row'])
+            schema['profile'] = name
+            schema['learned'] = True
+
+    df = reader(source, header=schema['header_row'], usecols=list(schema['mapping']))
+    return df.rename(columns=schema['mapping']), schema
+
+
+def apply_schema(df):
+    """إعادة تسمية أعمدة جدول محمّل مسبقاً بالأسماء الموحدة"""
+    profile = load_profiles().get(fingerprint(df.columns))
+    if profile:
+        mapping = profile['mapping']
+    else:
+        mapping, _ = match_headers(list(df.columns))
+        missing = [field for field in REQUIRED_FIELDS if field not in mapping.values()]
+        if missing:
+            raise SchemaDetectionError(f"تعذر العثور على الأعمدة: {', '.join(missing)}")
+    return df.rename(columns=mapping)
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmark import BASELINE_FILE, _format, compare_with_baseline
+
+# مفتاح نتائج زمن البدء في ملف خط الأساس المشترك مع benchmark.py
+BASELINE_KEY = 'startup'
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# يُنفذ في عملية جديدة لكل قياس: التشغيل الأول للسكربت (صفحة البداية) ثم إعادات التشغيل
+APP_CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+from streamlit.testing.v1 import AppTest
+
+app_test = AppTest.from_file({script!r}, default_timeout=120)
+started = time.perf_counter()
+app_test.run()
+first_paint = time.perf_counter() - started
+pandas_loaded = 'pandas' in sys.modules
+
+reruns = []
+for _ in range({reruns}):
+    started = time.perf_counter()
+    app_test.run()
+    reruns.append(time.perf_counter() - started)
+
+print(json.dumps({{
+    'first_paint': first_paint,
+    'reruns': reruns,
+    'pandas_loaded': pandas_loaded,
+    'exceptions': [str(e.value) for e in app_test.exception],
+}}))
+'''
+
+# زمن استيراد المحرك المحاسبي (يدفعه المستخدم عند رفع أول ملف)
+ENGINE_CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import accounting_engine
+print(json.dumps({{'engine_import': time.perf_counter() - started}}))
+'''
+
+
+def _run_child(code):
+    """تنفيذ شيفرة في مفسر جديد وإرجاع (نتيجتها، الزمن الكلي للعملية)"""
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT)
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "فشل القياس")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), wall
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def measure_startup(script='app.py', runs=3, reruns=10):
+    """قياس البدء البارد وإعادة التشغيل لسكربت Streamlit
+
+    كل تشغيل في عملية جديدة (بدء بارد حقيقي)، والنتيجة هي الوسيط عبر التشغيلات.
+    """
+    script = os.path.join(ROOT, script)
+    cold, first_paint, rerun_times, engine = [], [], [], []
+    pandas_loaded = False
+    for _ in range(runs):
+        result, wall = _run_child(APP_CHILD.format(root=ROOT, script=script, reruns=reruns))
+        if result['exceptions']:
+            raise RuntimeError(f"خطأ في السكربت: {result['exceptions'][0]}")
+        cold.append(wall)
+        first_paint.append(result['first_paint'])
+        rerun_times.extend(result['reruns'])
+        pandas_loaded = pandas_loaded or result['pandas_loaded']
+
+        result, _ = _run_child(ENGINE_CHILD.format(root=ROOT))
+        engine.append(result['engine_import'])
+
+    results = {
+        'cold_start_process': {'seconds': _median(cold), 'peak_mb': None},
+        'first_paint': {'seconds': _median(first_paint), 'peak_mb': None},
+        'engine_import': {'seconds': _median(engine), 'peak_mb': None},
+    }
+    if rerun_times:
+        results['rerun_median'] = {'seconds': _median(rerun_times), 'peak_mb': None}
+        results['rerun_p95'] = {'seconds': _p95(rerun_times), 'peak_mb': None}
+    return results, pandas_loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن بدء واجهة Streamlit وزمن إعادة التشغيل")
+    parser.add_argument('--script', default='app.py', help="سكربت Streamlit المراد قياسه")
+    parser.add_argument('--runs', type=int, default=3, help="عدد مرات البدء البارد (كل مرة في عملية جديدة)")
+    parser.add_argument('--reruns', type=int, default=10, help="عدد إعادات التشغيل في كل عملية")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="ملف خط الأساس (مشترك مع benchmark.py)")
+    parser.add_argument('--save-baseline', action='store_true', help="حفظ النتائج كخط أساس جديد")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="نسبة التراجع المسموح بها قبل اعتباره تراجعاً")
+    args = parser.parse_args()
+
+    results, pandas_loaded = measure_startup(args.script, args.runs, args.reruns)
+
+    print(f"\n=== {args.script} ({args.runs} بدء بارد × {args.reruns} إعادة تشغيل) ===")
+    for stage, measured in results.items():
+        print(f"{stage:<32}{_format(measured['seconds'], 's'):>16}")
+    if pandas_loaded:
+        print("⚠️ تم تحميل pandas قبل ظهور صفحة البداية")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    label = f"{BASELINE_KEY}:{args.script}"
+    regressions = compare_with_baseline(label, results, baselines, args.tolerance)
+    for stage, metric, reference, measured in regressions:
+        print(f"⚠️ تراجع في {stage} ({metric}): {reference:,.3f} ← {measured:,.3f}")
+
+    if args.save_baseline:
+        baselines[label] = results
+        baselines.setdefault('_environment', {})['python'] = platform.python_version()
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"\nتم حفظ خط الأساس في {args.baseline}")
+        return 0
+
+    return 1 if regressions or pandas_loaded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
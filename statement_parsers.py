@@ -0,0 +1,343 @@
+import codecs
+import contextlib
+import csv
+import io
+import itertools
+import os
+import re
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+
+from schema_detection import read_statement
+
+# الأعمدة الموحدة التي تنتجها جميع المحللات (نفس أسماء أعمدة كشف Excel بعد التعرف عليها)
+STATEMENT_COLUMNS = ['[SA]Processing Date', 'التفاصيل', 'الوصف', 'المرجع', 'مدين', 'دائن', 'الرصيد']
+
+# امتدادات الملفات المدعومة في واجهة الرفع
+SUPPORTED_EXTENSIONS = ['xlsx', 'xls', 'csv', 'txt', 'sta', 'mt940', '940', 'xml']
+
+# عدد البايتات التي تُقرأ من بداية الملف لتحديد صيغته
+SNIFF_BYTES = 4096
+
+MT940_LINE_61 = re.compile(
+    r'^(?P<date>\d{6})(?P<entry_date>\d{4})?(?P<mark>R?[CD])(?P<funds>[A-Z])?'
+    r'(?P<amount>\d+,\d*)(?P<type>[A-Z])(?P<code>[A-Z0-9]{3})(?P<reference>[^/]*)(?://(?P<bank_reference>.*))?$'
+)
+# مبلغ بفاصلة عشرية (1.234,56 أو -500,0) أو بنقطة عشرية (1,234.56)
+DECIMAL_COMMA_AMOUNT = re.compile(r'-?[\d. ]*\d,\d{1,2}')
+DECIMAL_POINT_AMOUNT = re.compile(r'-?[\d, ]*\d\.\d{1,2}')
+MT940_BALANCE = re.compile(r'^(?P<mark>[CD])(?P<date>\d{6})(?P<currency>[A-Z]{3})(?P<amount>\d+,\d*)')
+
+
+class StatementParseError(ValueError):
+    """تعذر تحليل ملف كشف الحساب"""
+
+
+class _Columns:
+    """تجميع الحركات في أعمدة (بدلاً من قائمة قواميس) للحفاظ على الذاكرة"""
+
+    def __init__(self):
+        self.dates = []
+        self.details = []
+        self.descriptions = []
+        self.references = []
+        self.amounts = array('d')
+        self.balances = array('d')
+
+    def append(self, date, details, description, reference, amount, balance):
+        self.dates.append(date)
+        self.details.append(details)
+        self.descriptions.append(description)
+        self.references.append(reference)
+        self.amounts.append(amount)
+        self.balances.append(balance)
+
+    def to_frame(self, date_format=None):
+        import pandas as pd
+
+        amounts = pd.Series(self.amounts, dtype='float64')
+        return pd.DataFrame({
+            '[SA]Processing Date': pd.to_datetime(pd.Series(self.dates, dtype='object'), format=date_format, errors='coerce'),
+            'التفاصيل': self.details,
+            'الوصف': self.descriptions,
+            'المرجع': self.references,
+            # نفس اصطلاح كشف Excel: المدين بقيمة سالبة والدائن بقيمة موجبة
+            'مدين': amounts.where(amounts < 0),
+            'دائن': amounts.where(amounts > 0),
+            'الرصيد': pd.Series(self.balances, dtype='float64'),
+        }, columns=STATEMENT_COLUMNS)
+
+
+def _open_binary(source):
+    """فتح المصدر (مسار أو ملف مرفوع) كملف ثنائي دون إغلاق ملفات المستدعي"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    source.seek(0)
+    return contextlib.nullcontext(source)
+
+
+def _sniff(source):
+    """قراءة بداية الملف دون استهلاكه"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read(SNIFF_BYTES)
+    source.seek(0)
+    head = source.read(SNIFF_BYTES)
+    source.seek(0)
+    return head
+
+
+def _amount(text):
+    return float(text.replace(',', '.'))
+
+
+def detect_format(source, file_name=None):
+    """تحديد صيغة الملف من امتداده ثم من محتواه"""
+    file_name = file_name or getattr(source, 'name', None) or (str(source) if isinstance(source, (str, os.PathLike)) else '')
+    extension = os.path.splitext(file_name)[1].lower().lstrip('.')
+    if extension in ('xlsx', 'xls'):
+        return 'excel'
+    if extension in ('sta', 'mt940', '940'):
+        return 'mt940'
+
+    head = _sniff(source).lstrip(b'\xef\xbb\xbf \r\n\t')
+    if head.startswith(b'<?xml') or head.startswith(b'<'):
+        return 'camt053'
+    if head.startswith(b'{1:') or head.startswith(b':20:') or b'\n:61:' in head or b'\n:60F:' in head:
+        return 'mt940'
+    if head.startswith(b'PK') or head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'excel'
+    return 'csv'
+
+
+def _csv_reader(encoding, delimiter, decimal='.'):
+    """قارئ CSV بنفس واجهة pd.read_excel التي تستخدمها آلية التعرف على الأعمدة"""
+    import pandas as pd
+
+    options = {'encoding': encoding, 'sep': delimiter}
+    if decimal == ',':
+        options.update(decimal=',', thousands='.')
+
+    def reader(source, header=0, nrows=None, usecols=None):
+        if header is None:
+            # معاينة أول الأسطر: قد تسبق العناوين أسطر عنوان بعدد حقول مختلف
+            text = _sniff(source).decode(encoding, errors='replace')
+            rows = itertools.islice(csv.reader(io.StringIO(text), delimiter=delimiter), nrows)
+            return pd.DataFrame(list(rows))
+        # skiprows يعد الأسطر الفعلية (بما فيها الفارغة) كما في المعاينة
+        return pd.read_csv(source, skiprows=header, header=0, nrows=nrows, usecols=usecols, **options)
+    return reader
+
+
+def _guess_delimiter(text):
+    """اختيار الفاصل الذي يتكرر بنفس العدد في أكبر عدد من الأسطر"""
+    lines = [line for line in text.splitlines()[:-1] if line.strip()] or text.splitlines()
+    best, best_rank = ',', (0, 0)
+    for delimiter in ',;\t|':
+        counts = Counter(line.count(delimiter) for line in lines if delimiter in line)
+        if counts:
+            count, frequency = counts.most_common(1)[0]
+            if (frequency, count) > best_rank:
+                best, best_rank = delimiter, (frequency, count)
+    return best
+
+
+def _guess_decimal(text, delimiter):
+    """تحديد الفاصل العشري من عينة الملف
+
+    الفاصلة عشرية فقط إذا ظهرت مبالغ مثل 65406,72 ولم تظهر مبالغ بنقطة عشرية؛
+    وفي غير ذلك تُترك فواصل الآلاف لتنظيف البيانات (clean_data).
+    """
+    if delimiter == ',':
+        return '.'
+    comma = point = False
+    for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+        for field in row:
+            field = field.strip()
+            comma = comma or DECIMAL_COMMA_AMOUNT.fullmatch(field) is not None
+            point = point or DECIMAL_POINT_AMOUNT.fullmatch(field) is not None
+    return ',' if comma and not point else '.'
+
+
+def parse_csv(source, learn=True):
+    """قراءة كشف CSV بالأعمدة المطلوبة فقط عبر نفس آلية التعرف على الأعمدة"""
+    head = _sniff(source)
+    try:
+        # final=False: المعاينة قد تقطع آخر حرف عربي (متعدد البايتات) فلا يُعد خطأ ترميز
+        text = codecs.getincrementaldecoder('utf-8-sig')().decode(head, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        # التصدير العربي القديم من Excel على ويندوز
+        text = head.decode('cp1256', errors='replace')
+        encoding = 'cp1256'
+
+    delimiter = _guess_delimiter(text)
+    reader = _csv_reader(encoding, delimiter, _guess_decimal(text, delimiter))
+    return read_statement(source, reader=reader, learn=learn)
+
+
+def parse_mt940(source):
+    """تحليل كشف SWIFT MT940 سطراً سطراً
+
+    الرصيد يُحسب تراكمياً من الرصيد الافتتاحي (:60F:) لكل كشف في الملف.
+    """
+    columns = _Columns()
+    balance = 0.0
+    pending = None
+    tag, value = None, []
+
+    def flush_tag():
+        nonlocal balance, pending
+        if tag is None:
+            return
+        text = '\n'.join(value)
+        if tag in ('60F', '60M'):
+            match = MT940_BALANCE.match(text)
+            if not match:
+                raise StatementParseError(f"رصيد افتتاحي غير صالح: {text}")
+            balance = _amount(match['amount']) * (-1 if match['mark'] == 'D' else 1)
+        elif tag == '61':
+            flush_entry()
+            match = MT940_LINE_61.match(text.split('\n')[0])
+            if not match:
+                raise StatementParseError(f"حركة غير صالحة: {text}")
+            # RC (عكس دائن) تُعامل كمدين، وRD (عكس مدين) كدائن
+            sign = -1 if match['mark'] in ('D', 'RC') else 1
+            amount = _amount(match['amount']) * sign
+            balance = round(balance + amount, 2)
+            pending = [match['date'], match['code'], '', match['reference'].strip() or None, amount, balance]
+        elif tag == '86' and pending is not None:
+            description = ' '.join(line.strip() for line in value)
+            pending[2] = description
+            # أول جزء من المعلومات الإضافية هو نوع العملية عادة
+            pending[1] = re.split(r'[?/\n]', value[0])[0].strip() or pending[1]
+
+    def flush_entry():
+        nonlocal pending
+        if pending is not None:
+            columns.append(*pending)
+            pending = None
+
+    with _open_binary(source) as raw:
+        for raw_line in raw:
+            line = raw_line.decode('utf-8', errors='replace').rstrip('\r\n')
+            match = re.match(r'^:(\d{2}[A-Z]?):(.*)$', line)
+            if match:
+                flush_tag()
+                tag, value = match.group(1), [match.group(2)]
+            elif line.startswith('-}') or line.startswith('{'):
+                flush_tag()
+                tag, value = None, []
+            elif tag is not None:
+                value.append(line)
+        flush_tag()
+        flush_entry()
+
+    return columns.to_frame(date_format='%y%m%d'), {
+        'profile': 'mt940', 'bank': 'SWIFT MT940', 'mapping': {}, 'scores': {},
+    }
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _find(element, path):
+    """البحث بمسار من الأسماء المحلية (بغض النظر عن نطاق الأسماء)"""
+    for name in path.split('/'):
+        if element is None:
+            return None
+        element = next((child for child in element if _local(child.tag) == name), None)
+    return element
+
+
+def _text(element, path):
+    found = _find(element, path)
+    return found.text.strip() if found is not None and found.text else None
+
+
+def parse_camt053(source):
+    """تحليل كشف ISO 20022 CAMT.053 بالتدفق عبر iterparse
+
+    كل حركة (Ntry) تُحذف من الشجرة بعد قراءتها حتى تبقى الذاكرة ثابتة مهما كان حجم الملف.
+    الرصيد التراكمي في نهاية كل كشف يُطابق برصيد الإقفال (CLBD) إن وُجد مع الرصيد الافتتاحي.
+    """
+    columns = _Columns()
+    balance = 0.0
+    statement = None
+    opening = closing = None
+
+    with _open_binary(source) as raw:
+        for event, element in ET.iterparse(raw, events=('start', 'end')):
+            name = _local(element.tag)
+
+            if event == 'start':
+                if name == 'Stmt':
+                    statement = element
+                    balance = 0.0
+                    opening = closing = None
+                continue
+
+            if name == 'Bal' and statement is not None:
+                code = _text(element, 'Tp/CdOrPrtry/Cd')
+                sign = -1 if _text(element, 'CdtDbtInd') == 'DBIT' else 1
+                if code in ('OPBD', 'PRCD'):
+                    opening = balance = float(_text(element, 'Amt')) * sign
+                elif code == 'CLBD':
+                    closing = float(_text(element, 'Amt')) * sign
+                statement.remove(element)
+
+            elif name == 'Ntry':
+                # CdtDbtInd هو اتجاه القيد الفعلي حتى في حركات العكس (RvslInd)، فلا يُعكس
+                sign = -1 if _text(element, 'CdtDbtInd') == 'DBIT' else 1
+                amount = float(_text(element, 'Amt')) * sign
+                balance = round(balance + amount, 2)
+
+                date = _text(element, 'BookgDt/Dt') or _text(element, 'BookgDt/DtTm') or _text(element, 'ValDt/Dt')
+                details = (_text(element, 'AddtlNtryInf')
+                           or _text(element, 'BkTxCd/Prtry/Cd')
+                           or _text(element, 'BkTxCd/Domn/Fmly/SubFmlyCd'))
+                description = _text(element, 'NtryDtls/TxDtls/RmtInf/Ustrd') or details
+                reference = _text(element, 'AcctSvcrRef') or _text(element, 'NtryDtls/TxDtls/Refs/EndToEndId')
+
+                columns.append(date[:10] if date else None, details, description, reference, amount, balance)
+
+                element.clear()
+                if statement is not None:
+                    statement.remove(element)
+
+            elif name == 'Stmt':
+                if opening is not None and closing is not None and abs(balance - closing) >= 0.005:
+                    raise StatementParseError(
+                        f"الرصيد المحسوب ({balance:,.2f}) لا يطابق رصيد الإقفال في الكشف ({closing:,.2f})"
+                    )
+                element.clear()
+                statement = None
+
+    return columns.to_frame(date_format='%Y-%m-%d'), {
+        'profile': 'camt053', 'bank': 'ISO 20022 CAMT.053', 'mapping': {}, 'scores': {},
+    }
+
+
+PARSERS = {
+    'excel': read_statement,
+    'csv': parse_csv,
+    'mt940': parse_mt940,
+    'camt053': parse_camt053,
+}
+
+
+# الصيغ التي تمر بآلية التعرف على الأعمدة وقد تحفظ ملف تعريف جديد
+LEARNING_FORMATS = ('excel', 'csv')
+
+
+def parse_statement(source, file_name=None, learn=True):
+    """قراءة كشف الحساب بأي صيغة مدعومة وإرجاع (الجدول الموحد، وصف التنسيق)
+
+    learn=False يمنع حفظ التنسيقات الجديدة المكتشفة تقريبياً (مثل طلبات خادم API).
+    """
+    file_format = detect_format(source, file_name)
+    if file_format in LEARNING_FORMATS:
+        return PARSERS[file_format](source, learn=learn)
+    return PARSERS[file_format](source)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.testclient import TestClient
+
+import api_server
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bank1.xlsx')
+
+
+def _tenant(name):
+    return {api_server.TENANT_HEADER: name}
+
+
+def _wait(client, job_id, tenant, timeout=120):
+    """انتظار انتهاء المهمة وإرجاع حالتها"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/jobs/{job_id}', headers=_tenant(tenant)).json()
+        if job['status'] != 'pending' or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+class _BlockedExecutor(ThreadPoolExecutor):
+    """مجموعة عمال لا تنهي أي مهمة حتى يُفتح الحاجز (لملء الطابور)"""
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.gate = threading.Event()
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(lambda: (self.gate.wait(), {})[1])
+
+
+def test_upload_process_and_reports():
+    with open(SAMPLE, 'rb') as f:
+        content = f.read()
+
+    with TestClient(api_server.create_app(workers=2)) as client:
+        response = client.post('/statements?filename=bank1.xlsx', content=content, headers=_tenant('a'))
+        assert response.status_code == 202
+        job = response.json()
+        assert job['status'] == 'pending'
+
+        done = _wait(client, job['job_id'], 'a')
+        assert done['status'] == 'done', done['error']
+
+        reports = client.get(done['reports_url'], headers=_tenant('a')).json()
+        assert set(reports) == set(api_server.REPORT_NAMES)
+        assert reports['summary']['rows'] > 0
+        trial_balance = client.get(done['reports_url'] + '/trial_balance', headers=_tenant('a')).json()
+        assert sum(row['مجموع المدين'] for row in trial_balance) == sum(row['مجموع الدائن'] for row in trial_balance)
+
+        # مستأجر آخر لا يرى المهمة ولا تقارير كشف لم يرفعه
+        assert client.get(f"/jobs/{job['job_id']}", headers=_tenant('b')).status_code == 404
+        assert client.get(done['reports_url'], headers=_tenant('b')).status_code == 404
+
+        # رفع نفس الملف من مستأجر آخر يُجاب من الذاكرة المؤقتة دون إعادة المعالجة
+        cached = client.post('/statements?filename=bank1.xlsx', content=content, headers=_tenant('b'))
+        assert cached.status_code == 200
+        assert cached.json()['status'] == 'done'
+        assert client.get(done['reports_url'], headers=_tenant('b')).json() == reports
+        assert client.get('/health').json()['cache']['hits'] == 1
+
+
+def test_full_queue_is_rejected():
+    executor = _BlockedExecutor()
+    app = api_server.create_app(executor=executor, max_pending=2, max_tenant_pending=1)
+    try:
+        with TestClient(app) as client:
+            assert client.post('/statements', content=b'1', headers=_tenant('a')).status_code == 202
+
+            response = client.post('/statements', content=b'2', headers=_tenant('a'))
+            assert response.status_code == 429
+            assert response.json()['scope'] == 'tenant'
+            assert response.headers['retry-after'] == str(api_server.RETRY_AFTER_SECONDS)
+
+            assert client.post('/statements', content=b'3', headers=_tenant('b')).status_code == 202
+            response = client.post('/statements', content=b'4', headers=_tenant('c'))
+            assert response.status_code == 503
+            assert response.json()['scope'] == 'server'
+    finally:
+        executor.gate.set()
+        executor.shutdown()
+
+
+def test_full_queue_rejects_before_reading_body():
+    executor = _BlockedExecutor()
+    app = api_server.create_app(executor=executor, max_pending=1)
+    app.state.jobs.submit('a', b'1', 'statement.xlsx')
+    received = []
+    sent = []
+
+    async def receive():
+        received.append(True)
+        return {'type': 'http.request', 'body': b'x' * 1024, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+        'scheme': 'http', 'path': '/statements', 'raw_path': b'/statements', 'root_path': '',
+        'query_string': b'', 'headers': [(b'x-tenant-id', b'b'), (b'content-length', b'1024')],
+        'client': ('127.0.0.1', 1), 'server': ('testserver', 80), 'app': app,
+    }
+    try:
+        asyncio.run(app.router(scope, receive, send))
+    finally:
+        executor.gate.set()
+        executor.shutdown()
+
+    assert sent[0]['status'] == 503
+    assert not received